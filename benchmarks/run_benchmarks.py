@@ -0,0 +1,406 @@
+# Headless benchmarks for the utils data layer and the Product List search path.
+# Every catalog size runs in its own subprocess against a scratch database and
+# images directory, so sizes don't share caches and peak memory is per size.
+#
+#   python benchmarks/run_benchmarks.py --sizes 1k,100k --output results.json
+#   python benchmarks/run_benchmarks.py --sizes 1k --baseline results.json
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_catalog import IMAGE_POOL_SIZE, generate_catalog, make_image_bytes, parse_size
+
+DEFAULT_SIZES = "1k,100k"
+DEFAULT_ITERATIONS = 50
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+# The legacy row-by-row search scan takes minutes per call on very large catalogs
+SLOW_BENCHMARK_MAX_SIZE = 100_000
+
+BENCHMARKS = []
+
+
+# Register a benchmark. `slow` ones run fewer iterations and are skipped above
+# SLOW_BENCHMARK_MAX_SIZE unless --include-slow is given.
+def benchmark(name, slow=False):
+    def register(func):
+        BENCHMARKS.append({'name': name, 'func': func, 'slow': slow})
+        return func
+    return register
+
+
+# Stand-in for a Streamlit UploadedFile
+class FakeUpload:
+    def __init__(self, data):
+        self.data = data
+
+    def getvalue(self):
+        return self.data
+
+
+# Shared state for one catalog size. Benchmarks return a zero-argument callable
+# to time, so any per-call setup happens outside the measured region.
+class BenchContext:
+    def __init__(self, size, seed=42):
+        import utils
+        self.utils = utils
+        self.size = size
+        self.rng = random.Random(seed)
+        self.sample_ids = [f"PRD-{self.rng.randrange(size):07d}" for _ in range(1000)]
+        with utils.db_connection() as conn:
+            rows = conn.execute("SELECT mould_no, location FROM products ORDER BY RANDOM() LIMIT 200").fetchall()
+        self.queries = [row['mould_no'][:4] for row in rows] + [row['location'] for row in rows[:50]] + ["bucket", "lid snap", "tumbler"]
+        self.upload = FakeUpload(make_image_bytes(self.rng))
+        self.new_id_counter = 0
+
+    def next_new_id(self):
+        self.new_id_counter += 1
+        return f"BENCH-{self.new_id_counter:07d}"
+
+    def new_product(self, product_id):
+        return {
+            'id': product_id, 'mould_no': "M-BENCH", 'description': "Benchmark product", 'image_url': "",
+            'location': "R99-Z9", 'hook': "Metal", 'cavaties': 4, 'part_wt': 12.5, 'short_wt': 55.0,
+        }
+
+
+@benchmark("load_data_cold", slow=True)
+def bench_load_data_cold(ctx):
+    def run():
+        ctx.utils.catalog_cache.clear()
+        ctx.utils.load_data()
+    return run
+
+
+@benchmark("load_data_warm")
+def bench_load_data_warm(ctx):
+    ctx.utils.load_data()
+    return ctx.utils.load_data
+
+
+# The search previously used by main.display_products, kept as a reference point
+@benchmark("search_dataframe_scan", slow=True)
+def bench_search_dataframe_scan(ctx):
+    df = ctx.utils.load_data()
+    query = ctx.rng.choice(ctx.queries).lower()
+
+    def run():
+        df[df.apply(lambda row: row.astype(str).str.lower().str.contains(query, na=False).any(), axis=1)]
+    return run
+
+
+@benchmark("search_products")
+def bench_search_products(ctx):
+    query = ctx.rng.choice(ctx.queries)
+    return lambda: ctx.utils.search_products.__wrapped__(query, limit=100)
+
+
+# Every single-character substitution and adjacent swap of a value
+def typo_variants(text):
+    variants = [text[:i] + ('X' if text[i] != 'X' else 'Y') + text[i + 1:] for i in range(len(text))]
+    variants += [text[:i] + text[i + 1] + text[i] + text[i + 2:] for i in range(len(text) - 1) if text[i] != text[i + 1]]
+    return variants
+
+
+# A sample mould number mistyped at a random position
+@benchmark("fuzzy_search_products")
+def bench_fuzzy_search_products(ctx):
+    product = ctx.utils.get_product_by_id(ctx.rng.choice(ctx.sample_ids))
+    query = ctx.rng.choice(typo_variants(product['mould_no']))
+    return lambda: ctx.utils.fuzzy_search_products.__wrapped__(query)
+
+
+# Share of typo_variants of sample mould numbers (short codes, like the fuzzy
+# keys cover) for which fuzzy search finds the product
+def fuzzy_recall(ctx, samples=50):
+    found = total = 0
+    for product_id in ctx.sample_ids[:samples]:
+        product = ctx.utils.get_product_by_id(product_id)
+        for query in typo_variants(product['mould_no']):
+            total += 1
+            found += product_id in set(ctx.utils.fuzzy_search_products.__wrapped__(query)['id'])
+    return found / total if total else 0.0
+
+
+@benchmark("count_products")
+def bench_count_products(ctx):
+    return ctx.utils.count_products.__wrapped__
+
+
+@benchmark("products_page_first")
+def bench_products_page_first(ctx):
+    return lambda: ctx.utils.get_products_page.__wrapped__(None, "next", 25)
+
+
+@benchmark("products_page_deep")
+def bench_products_page_deep(ctx):
+    cursor_id = f"PRD-{int(ctx.size * 0.9):07d}"
+    return lambda: ctx.utils.get_products_page.__wrapped__(cursor_id, "next", 25)
+
+
+@benchmark("get_product_by_id")
+def bench_get_product_by_id(ctx):
+    product_id = ctx.rng.choice(ctx.sample_ids)
+    return lambda: ctx.utils.get_product_by_id(product_id)
+
+
+@benchmark("add_product_to_db")
+def bench_add_product(ctx):
+    product = ctx.new_product(ctx.next_new_id())
+    return lambda: ctx.utils.add_product_to_db(product)
+
+
+@benchmark("update_product_in_db")
+def bench_update_product(ctx):
+    product_id = ctx.rng.choice(ctx.sample_ids)
+    product = ctx.new_product(product_id)
+    product['description'] = f"Updated {ctx.rng.random()}"
+    return lambda: ctx.utils.update_product_in_db(product_id, product)
+
+
+# Re-rack 100 products in one batch, as saved by the Bulk Edit page
+@benchmark("update_products_in_db")
+def bench_update_products(ctx):
+    location = f"R{ctx.rng.randrange(1, 40):02d}-Z{ctx.rng.randrange(1, 9)}"
+    changes = {product_id: {'location': location} for product_id in ctx.rng.sample(sorted(set(ctx.sample_ids)), 100)}
+    return lambda: ctx.utils.update_products_in_db(changes)
+
+
+@benchmark("delete_product_from_db")
+def bench_delete_product(ctx):
+    product_id = ctx.next_new_id()
+    ctx.utils.add_product_to_db(ctx.new_product(product_id))
+    return lambda: ctx.utils.delete_product_from_db(product_id)
+
+
+@benchmark("upload_image_to_local")
+def bench_upload_image(ctx):
+    product_id = ctx.next_new_id()
+    # Trailing bytes after the JPEG end marker make every upload distinct content
+    upload = FakeUpload(ctx.upload.data + os.urandom(16))
+    return lambda: ctx.utils.upload_image_to_local(upload, product_id)
+
+
+# Time until the add/update pages get control back; processing happens in the worker pool
+@benchmark("upload_image_in_background")
+def bench_upload_image_in_background(ctx):
+    product_id = ctx.next_new_id()
+    ctx.utils.add_product_to_db(ctx.new_product(product_id))
+    upload = FakeUpload(ctx.upload.data + os.urandom(16))
+    return lambda: ctx.utils.upload_image_in_background(upload, product_id)
+
+
+@benchmark("upload_image_duplicate")
+def bench_upload_image_duplicate(ctx):
+    product_id = ctx.next_new_id()
+    ctx.utils.upload_image_to_local(ctx.upload, product_id)
+    return lambda: ctx.utils.upload_image_to_local(ctx.upload, product_id)
+
+
+@benchmark("load_image_bytes")
+def bench_load_image_bytes(ctx):
+    image_url = os.path.relpath(os.path.join(ctx.utils.IMAGES_DIR, f"synthetic-{ctx.rng.randrange(IMAGE_POOL_SIZE):03d}.jpg"),
+                                os.path.dirname(ctx.utils.__file__))
+    return lambda: ctx.utils.load_image_bytes(image_url, width=200)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# Time `iterations` calls (fresh setup per call), then one more call under
+# tracemalloc to record peak Python-level allocations.
+def measure(ctx, bench, iterations):
+    latencies = []
+    for _ in range(iterations):
+        run = bench['func'](ctx)
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+
+    run = bench['func'](ctx)
+    tracemalloc.start()
+    run()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        'iterations': iterations,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'mean_ms': total / iterations * 1000,
+        'ops_per_sec': iterations / total if total else 0.0,
+        'peak_alloc_bytes': peak_bytes,
+    }
+
+
+# Runs inside the per-size subprocess (PRODUCTS_DB_PATH / PRODUCTS_IMAGES_DIR already set)
+def run_size(size, iterations, include_slow, only=None):
+    # Silence bare-mode warnings from st.* calls made outside a Streamlit server
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")
+
+    start = time.perf_counter()
+    generate_catalog(size)
+    generate_seconds = time.perf_counter() - start
+
+    ctx = BenchContext(size)
+    results = {
+        'generate_catalog': {
+            'iterations': 1,
+            'seconds': generate_seconds,
+            'ops_per_sec': size / generate_seconds if generate_seconds else 0.0,
+        }
+    }
+    for bench in BENCHMARKS:
+        if only and bench['name'] not in only:
+            continue
+        if bench['slow'] and size > SLOW_BENCHMARK_MAX_SIZE and not include_slow:
+            continue
+        bench_iterations = max(3, iterations // 10) if bench['slow'] else iterations
+        print(f"  {bench['name']} ({bench_iterations} iterations)", file=sys.stderr, flush=True)
+        results[bench['name']] = measure(ctx, bench, bench_iterations)
+
+    db_path = ctx.utils.DB_PATH
+    return {
+        'size': size,
+        'db_size_bytes': sum(os.path.getsize(path) for path in (db_path, db_path + '-wal') if os.path.exists(path)),
+        'catalog_memory_bytes': int(ctx.utils.load_data().memory_usage(deep=True).sum()),
+        'fuzzy_recall': fuzzy_recall(ctx),
+        'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'benchmarks': results,
+    }
+
+
+def run_size_in_subprocess(size_label, args):
+    with tempfile.TemporaryDirectory(prefix="product-bench-") as scratch_dir:
+        result_path = os.path.join(scratch_dir, "result.json")
+        env = dict(os.environ)
+        env['PRODUCTS_DB_PATH'] = os.path.join(scratch_dir, "products.db")
+        env['PRODUCTS_IMAGES_DIR'] = os.path.join(scratch_dir, "images")
+        command = [sys.executable, os.path.abspath(__file__), "--worker", size_label,
+                   "--iterations", str(args.iterations), "--result-path", result_path]
+        if args.include_slow:
+            command.append("--include-slow")
+        for name in args.only or []:
+            command += ["--only", name]
+        subprocess.run(command, env=env, check=True)
+        with open(result_path) as f:
+            return json.load(f)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Print p50 changes against a baseline results file; returns the regressions found
+def compare_with_baseline(results, baseline, threshold):
+    regressions = []
+    print(f"\n{'size':>9}  {'benchmark':<24} {'baseline p50':>13} {'current p50':>13} {'change':>8}")
+    for size_label, size_result in results['sizes'].items():
+        baseline_size = baseline.get('sizes', {}).get(size_label)
+        if not baseline_size:
+            continue
+        for name, current in size_result['benchmarks'].items():
+            previous = baseline_size['benchmarks'].get(name)
+            if not previous or 'p50_ms' not in current or 'p50_ms' not in previous or not previous['p50_ms']:
+                continue
+            change = current['p50_ms'] / previous['p50_ms'] - 1
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions.append((size_label, name, change))
+            print(f"{size_label:>9}  {name:<24} {previous['p50_ms']:>11.3f}ms {current['p50_ms']:>11.3f}ms {change:>+7.1%}{flag}")
+    return regressions
+
+
+def print_results(results):
+    for size_label, size_result in results['sizes'].items():
+        print(f"\n== {size_label} products (db {size_result['db_size_bytes'] / 1e6:.1f} MB, "
+              f"catalog {size_result.get('catalog_memory_bytes', 0) / 1e6:.1f} MB, "
+              f"max RSS {size_result['max_rss_bytes'] / 1e6:.0f} MB, "
+              f"fuzzy recall {size_result.get('fuzzy_recall', 0):.1%}) ==")
+        print(f"{'benchmark':<24} {'p50':>10} {'p95':>10} {'ops/s':>10} {'peak alloc':>12}")
+        for name, result in size_result['benchmarks'].items():
+            if 'p50_ms' not in result:
+                print(f"{name:<24} {result['seconds']:>9.2f}s {'':>10} {result['ops_per_sec']:>10.0f}")
+                continue
+            print(f"{name:<24} {result['p50_ms']:>8.3f}ms {result['p95_ms']:>8.3f}ms "
+                  f"{result['ops_per_sec']:>10.1f} {result['peak_alloc_bytes'] / 1e6:>10.2f}MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the product data layer on synthetic catalogs.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma separated catalog sizes (default: {DEFAULT_SIZES}, e.g. 1k,100k,1m)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="Timed calls per benchmark")
+    parser.add_argument("--only", action="append", metavar="BENCHMARK", help="Only run the named benchmark (repeatable)")
+    parser.add_argument("--include-slow", action="store_true",
+                        help=f"Also run slow benchmarks on catalogs larger than {SLOW_BENCHMARK_MAX_SIZE}")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare against a previous results JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="Relative p50 slowdown reported as a regression (default: 0.10)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regressions")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--result-path", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        result = run_size(parse_size(args.worker), args.iterations, args.include_slow, args.only)
+        with open(args.result_path, 'w') as f:
+            json.dump(result, f)
+        return 0
+
+    results = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'iterations': args.iterations,
+        'sizes': {},
+    }
+    for size_label in [label.strip() for label in args.sizes.split(',') if label.strip()]:
+        print(f"Benchmarking {size_label} products...", file=sys.stderr, flush=True)
+        results['sizes'][size_label] = run_size_in_subprocess(size_label, args)
+
+    print_results(results)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# Startup-time report: how long a fresh Python process takes to import each page
+# and tool, and to open the database for the first time (new and existing
+# databases), plus which heavy libraries each step pulls in. Every measurement
+# runs in its own interpreter against a scratch database, like a container restart.
+#
+#   python benchmarks/startup_report.py --runs 5 --output startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(REPO_ROOT, 'src')
+
+DEFAULT_RUNS = 5
+HEAVY_MODULES = ['pandas', 'numpy', 'PIL.Image', 'pyarrow']
+
+# name: (setup run before timing, code timed)
+STARTUP_STEPS = {
+    'import streamlit': ("", "import streamlit"),
+    'import utils': ("import streamlit", "import utils"),
+    'page main': ("import streamlit", "import main"),
+    'page add_product': ("import streamlit", "import add_product"),
+    'page update_product': ("import streamlit", "import update_product"),
+    'page bulk_import': ("import streamlit", "import bulk_import"),
+    'tool catalog_import': ("", "import catalog_import"),
+    'tool catalog_export': ("", "import catalog_export"),
+    'first query, new db': ("import utils", "utils.get_product_by_id('PRD-0000000')"),
+    'first query, existing db': ("import utils", "utils.get_product_by_id('PRD-0000000')"),
+}
+
+# Runs in the child interpreter: times `code` and reports which heavy modules are loaded
+CHILD_TEMPLATE = """
+import json, sys, time
+sys.path.insert(0, {src_dir!r})
+{setup}
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'modules': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_step(name, scratch_dir):
+    setup, code = STARTUP_STEPS[name]
+    env = dict(os.environ)
+    env['PRODUCTS_DB_PATH'] = os.path.join(scratch_dir, "products.db")
+    env['PRODUCTS_IMAGES_DIR'] = os.path.join(scratch_dir, "images")
+    if name.endswith("new db"):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(env['PRODUCTS_DB_PATH'] + suffix):
+                os.remove(env['PRODUCTS_DB_PATH'] + suffix)
+    source = CHILD_TEMPLATE.format(src_dir=SRC_DIR, setup=setup, code=code, heavy=HEAVY_MODULES)
+    completed = subprocess.run([sys.executable, "-c", source], env=env, cwd=SRC_DIR,
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_report(runs):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="product-startup-") as scratch_dir:
+        for name in STARTUP_STEPS:
+            print(f"  {name} ({runs} runs)", file=sys.stderr, flush=True)
+            samples = [run_step(name, scratch_dir) for _ in range(runs)]
+            timings = [sample['seconds'] for sample in samples]
+            results[name] = {
+                'runs': runs,
+                'median_ms': statistics.median(timings) * 1000,
+                'max_ms': max(timings) * 1000,
+                'heavy_modules': samples[-1]['modules'],
+            }
+    return results
+
+
+def print_report(results):
+    print(f"\n{'step':<26} {'median':>10} {'max':>10}  heavy modules loaded")
+    for name, result in results.items():
+        print(f"{name:<26} {result['median_ms']:>8.1f}ms {result['max_ms']:>8.1f}ms  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import and database initialization times.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Fresh processes per step")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = run_report(args.runs)
+    print_report(results)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
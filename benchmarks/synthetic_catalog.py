@@ -0,0 +1,113 @@
+# Synthetic mould catalog generator for benchmarks.
+# Writes products (and a pool of JPEG images they reference) into whatever
+# database / images directory `utils` is pointed at through the
+# PRODUCTS_DB_PATH / PRODUCTS_IMAGES_DIR environment variables:
+#
+#   PRODUCTS_DB_PATH=/tmp/bench.db PRODUCTS_IMAGES_DIR=/tmp/bench-images \
+#       python benchmarks/synthetic_catalog.py 100k
+import argparse
+import io
+import os
+import random
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'src'))
+
+SIZE_PRESETS = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+INSERT_BATCH_SIZE = 5_000
+IMAGE_POOL_SIZE = 50
+
+ADJECTIVES = ["durable", "compact", "heavy-duty", "round", "square", "transparent", "ribbed", "stackable",
+              "food-grade", "reinforced", "slim", "wide-mouth", "lightweight", "textured", "insulated"]
+ITEMS = ["bucket", "lid", "container", "bottle cap", "crate", "tumbler", "tray", "hanger", "bowl", "jar",
+         "spoon", "chair leg", "pipe fitting", "mug", "storage box", "basin", "funnel", "handle", "bin", "plate"]
+DETAILS = ["with snap-fit lid", "for retail packaging", "with living hinge", "two-tone finish",
+           "with embossed logo", "for kitchen use", "with side handles", "hot-runner tool",
+           "family mould", "with tamper ring", "ISO thread", "for export orders"]
+
+
+def parse_size(value):
+    value = value.strip().lower()
+    if value in SIZE_PRESETS:
+        return SIZE_PRESETS[value]
+    multiplier = 1
+    if value.endswith('k'):
+        value, multiplier = value[:-1], 1_000
+    elif value.endswith('m'):
+        value, multiplier = value[:-1], 1_000_000
+    return int(float(value) * multiplier)
+
+
+# A JPEG photo-like image: gradient background with a few random shapes
+def make_image_bytes(rng, width=800, height=600):
+    from PIL import Image, ImageDraw
+    base = tuple(rng.randrange(256) for _ in range(3))
+    image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    image = Image.blend(image, Image.new('RGB', (width, height), base), 0.6)
+    draw = ImageDraw.Draw(image)
+    for _ in range(8):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(40, 300), y0 + rng.randrange(40, 300)
+        draw.ellipse((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def make_product(rng, index, image_urls):
+    return {
+        'id': f"PRD-{index:07d}",
+        'mould_no': f"M{rng.randrange(100, 99999)}{rng.choice(['', 'A', 'B', 'C'])}",
+        'description': f"{rng.choice(ADJECTIVES).capitalize()} {rng.choice(ITEMS)} {rng.choice(DETAILS)}",
+        'image_url': rng.choice(image_urls) if image_urls and rng.random() < 0.8 else "",
+        'location': f"R{rng.randrange(1, 40):02d}-{rng.choice('ABCDEF')}{rng.randrange(1, 9)}",
+        'hook': rng.choice(["Plastic", "Metal"]),
+        'cavaties': rng.choice([1, 1, 2, 2, 4, 4, 8, 16, 32]),
+        'part_wt': round(rng.uniform(0.5, 900.0), 2),
+        'short_wt': round(rng.uniform(1.0, 4000.0), 2),
+    }
+
+
+# Write a pool of images into IMAGES_DIR and return their image_url values
+def generate_images(rng, count=IMAGE_POOL_SIZE):
+    import utils
+    utils.ensure_db()
+    image_urls = []
+    for index in range(count):
+        path = os.path.join(utils.IMAGES_DIR, f"synthetic-{index:03d}.jpg")
+        with open(path, 'wb') as f:
+            f.write(make_image_bytes(rng))
+        image_urls.append(os.path.relpath(path, os.path.dirname(utils.__file__)))
+    return image_urls
+
+
+# Insert `size` synthetic products through the data layer in batched transactions
+def generate_catalog(size, seed=42, with_images=True):
+    import utils
+    rng = random.Random(seed)
+    image_urls = generate_images(rng) if with_images else []
+    batch = []
+    for index in range(size):
+        batch.append(make_product(rng, index, image_urls))
+        if len(batch) >= INSERT_BATCH_SIZE:
+            utils.upsert_products(batch)
+            batch = []
+    if batch:
+        utils.upsert_products(batch)
+    return image_urls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic product catalog.")
+    parser.add_argument("size", help="Number of products, e.g. 1k, 100k, 1m or 25000")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-images", action="store_true", help="Do not generate image files")
+    args = parser.parse_args(argv)
+    size = parse_size(args.size)
+    generate_catalog(size, args.seed, not args.no_images)
+    print(f"Generated {size} products.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,13 @@
 import streamlit as st
-from utils import load_data, add_product_to_db, upload_image_to_local
+from profiler import profile_page
+from utils import HOOK_OPTIONS, get_product_by_id, add_product_to_db, upload_image_in_background, validate_product
 
 st.set_page_config(page_title="Add New Product", page_icon="📦", layout="centered")
 
+@profile_page("add_product_page")
 def add_product_page():
     st.title("Add New Product")
 
-    df = load_data()
-
     with st.form("new_product_form", clear_on_submit=False):
         st.subheader("Product Details")
 
@@ -16,7 +16,7 @@ def add_product_page():
         description = st.text_area("Description", height=68).strip()
 
         location = st.text_input("Location", help="Rack").strip()
-        hook = st.selectbox("Hook", options=["Plastic", "Metal"]).strip()
+        hook = st.selectbox("Hook", options=HOOK_OPTIONS).strip()
         cavaties = st.number_input("Cavities", min_value=1, max_value=100, value=1, step=1)
         part_wt = st.number_input("Part Weight (g)", min_value=0.0, value=0.0, step=0.1)
         short_wt = st.number_input("Shot Weight (g)", min_value=0.0, value=0.0, step=0.1)
@@ -36,35 +36,26 @@ def add_product_page():
             
         if submitted:
             # Enhanced validation
-            if not product_id:
-                st.error("Product ID is a required field.")
-            elif len(product_id) > 50:
-                st.error("Product ID must be 50 characters or less.")
-            elif not product_id.replace('_', '').replace('-', '').isalnum():
-                st.error("Product ID can only contain letters, numbers, hyphens, and underscores.")
-            elif product_id in df['id'].values: # Still check local DataFrame for immediate feedback
+            validation_error = validate_product({
+                'id': product_id,
+                'mould_no': mould_no,
+                'description': description,
+                'location': location,
+                'hook': hook,
+                'cavaties': int(cavaties),
+                'part_wt': float(part_wt),
+                'short_wt': float(short_wt)
+            })
+            if validation_error:
+                st.error(validation_error)
+            elif get_product_by_id(product_id) is not None: # Primary key lookup, no need to load the catalog
                 st.error(f"Product with ID '{product_id}' already exists. Please use a unique ID.")
-            elif len(description) > 1000:
-                st.error("Description must be 1000 characters or less.")
-            elif len(mould_no) > 100:
-                st.error("Mould Number must be 100 characters or less.")
-            elif len(location) > 100:
-                st.error("Location must be 100 characters or less.")
             else:
-                image_url_to_save = ""
-
-                if uploaded_image is not None:
-                    uploaded_url = upload_image_to_local(uploaded_image, product_id)
-                    if uploaded_url:
-                        image_url_to_save = uploaded_url
-                    else:
-                        st.warning("Failed to upload image. Product will be added without an image URL.")
-                
                 new_product_data = { 
                     'id': product_id,
                     'mould_no': mould_no,
                     'description': description,
-                    'image_url': image_url_to_save,
+                    'image_url': "",
                     'location': location,
                     'hook': hook,
                     'cavaties': int(cavaties),
@@ -74,9 +65,13 @@ def add_product_page():
                 
                 if add_product_to_db(new_product_data):
                     st.success(f"Product '{product_id}' added successfully!")
-                    st.info("Form will be cleared automatically. You can add another product.")
-                    # Clear form by rerunning the page
-                    st.rerun()
+                    # The image is processed in the background and attached when ready
+                    if uploaded_image is not None and not upload_image_in_background(uploaded_image, product_id):
+                        st.warning("Failed to upload image. Product was added without an image.")
+                    else:
+                        st.info("Form will be cleared automatically. You can add another product.")
+                        # Clear form by rerunning the page
+                        st.rerun()
                 else:
                     st.error(f"Failed to add product '{product_id}'.")
 
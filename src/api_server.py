@@ -0,0 +1,235 @@
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from metrics import registry as metrics_registry
+from utils import (PRODUCT_COLUMNS, get_data_version, get_database_id, get_image_rendition, get_product_by_id,
+                   image_bytes_cache, local_image_path, search_products)
+
+# Read-only JSON API for scanner stations, served next to the Streamlit app:
+#
+#   GET /api/products/<id>                 one product
+#   GET /api/products/<id>/image?width=200 its image (smallest rendition covering width)
+#   GET /api/search?q=<query>&limit=20     ranked search results
+#   GET /metrics                           this process's metrics (Prometheus text format)
+#
+# JSON responses carry an ETag derived from the database id, the data version and
+# the request target, so polling clients get 304 Not Modified (served from the
+# response cache, no query) until a product changes. Only a request that resolves
+# gets a 304: a missing product is a 404 whatever ETag the client sends.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8502
+MAX_SEARCH_LIMIT = 100
+GZIP_MIN_BYTES = 512
+RESPONSE_CACHE_ENTRIES = 512
+
+PRODUCT_PATH_RE = re.compile(r'^/api/products/([^/]+)$')
+IMAGE_PATH_RE = re.compile(r'^/api/products/([^/]+)/image$')
+IMAGE_CONTENT_TYPES = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png', '.webp': 'image/webp'}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Encoded JSON bodies (plain and gzipped) keyed by database, data version and request target,
+# so a change is serialized and compressed once however many clients poll for it
+class ResponseCache:
+    def __init__(self, max_entries=RESPONSE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache()
+
+
+def product_json(product):
+    # NaN (missing values in DataFrame rows) isn't valid JSON
+    data = {col: None if product[col] != product[col] else product[col] for col in PRODUCT_COLUMNS}
+    data['image'] = image_link(product)
+    return data
+
+
+# Remote images are linked as is; only local ones are served by the image endpoint
+def image_link(product):
+    image_url = product['image_url']
+    if not image_url or image_url != image_url:
+        return None
+    if image_url.startswith(('http://', 'https://')):
+        return image_url
+    if local_image_path(image_url) is None:
+        return None
+    return f"/api/products/{product['id']}/image"
+
+
+def parse_int(params, name, default, minimum, maximum):
+    try:
+        value = int(params.get(name, [default])[0])
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer.")
+    return max(minimum, min(value, maximum))
+
+
+# Build the JSON document for a GET request path; raises ApiError for bad requests
+def build_json(path, params):
+    match = PRODUCT_PATH_RE.match(path)
+    if match:
+        product = get_product_by_id(unquote(match.group(1)))
+        if product is None:
+            raise ApiError(404, "Product not found.")
+        return product_json(product)
+    if path == '/api/search':
+        query = params.get('q', [''])[0].strip()
+        if not query:
+            raise ApiError(400, "Missing search query 'q'.")
+        limit = parse_int(params, 'limit', 20, 1, MAX_SEARCH_LIMIT)
+        offset = parse_int(params, 'offset', 0, 0, 1_000_000)
+        df = search_products(query, limit=limit, offset=offset)
+        return {'query': query, 'offset': offset,
+                'results': [product_json(product) for product in df.to_dict(orient='records')]}
+    raise ApiError(404, "Not found.")
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ProductAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            match = IMAGE_PATH_RE.match(url.path)
+            if url.path == '/metrics':
+                self.send_body(200, metrics_registry.render_prometheus().encode(), 'text/plain; version=0.0.4; charset=utf-8')
+            elif match:
+                self.send_image(unquote(match.group(1)), parse_qs(url.query))
+            else:
+                self.send_json(url, parse_qs(url.query))
+        except ApiError as e:
+            self.send_body(e.status, json.dumps({'error': str(e)}).encode(), 'application/json')
+        except Exception as e:
+            self.log_error("Request failed: %s", e)
+            self.send_body(500, json.dumps({'error': "Internal server error."}).encode(), 'application/json')
+
+    # The response is resolved (from the cache or built, raising ApiError) before the
+    # ETag is compared, so a 304 is only sent for something that exists
+    def send_json(self, url, params):
+        database_id, version = get_database_id(), get_data_version()
+        key = (database_id, version, url.path, url.query)
+        entry = response_cache.get(key)
+        if entry is None:
+            body = json.dumps(build_json(url.path, params), default=str).encode()
+            compressed = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+            entry = (body, compressed)
+            response_cache.put(key, entry)
+        target = f"{url.path}?{url.query}".encode()
+        etag = f'W/"{database_id}-{version}-{zlib.crc32(target):08x}"'
+        if self.etag_matches(etag):
+            self.send_body(304, b"", None, {'ETag': etag})
+            return
+        body, compressed = entry
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if compressed is not None and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = compressed
+            headers['Content-Encoding'] = 'gzip'
+        self.send_body(200, body, 'application/json', headers)
+
+    # Stored renditions never change in place, so their name and mtime make a strong ETag
+    def send_image(self, product_id, params):
+        product = get_product_by_id(product_id)
+        if product is None or not product['image_url']:
+            raise ApiError(404, "Product has no image.")
+        image_path = get_image_rendition(product['image_url'], parse_int(params, 'width', 200, 1, 4096))
+        data = image_bytes_cache.get(image_path) if image_path else None
+        if data is None:
+            raise ApiError(404, "Image not found.")
+        etag = f'"{os.path.basename(image_path)}-{os.stat(image_path).st_mtime_ns}"'
+        if self.etag_matches(etag):
+            self.send_body(304, b"", None, {'ETag': etag})
+            return
+        content_type = IMAGE_CONTENT_TYPES.get(os.path.splitext(image_path)[1].lower(), 'application/octet-stream')
+        self.send_body(200, data, content_type, {'ETag': etag, 'Cache-Control': 'no-cache'})
+
+    def etag_matches(self, etag):
+        if_none_match = self.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        # Weak comparison, as required for If-None-Match
+        candidates = [candidate.strip().removeprefix('W/') for candidate in if_none_match.split(',')]
+        return '*' in candidates or etag.removeprefix('W/') in candidates
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    # Polling clients would flood stderr with one line per request
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+    server = ThreadingHTTPServer((host, port), ApiRequestHandler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a read-only JSON API for product lookups.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Interface to bind (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    # The data layer reports errors through st.error; outside Streamlit those are just log noise
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")
+
+    server = make_server(args.host, args.port, args.verbose)
+    print(f"Serving product API on http://{args.host}:{args.port}/api/", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
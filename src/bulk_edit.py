@@ -0,0 +1,154 @@
+import streamlit as st
+from utils import HOOK_OPTIONS, get_facet_counts, iter_products, update_products_in_db, validate_product
+
+st.set_page_config(page_title="Bulk Edit", page_icon="📦", layout="wide")
+
+# Larger selections are cut off; narrow them with the filters instead
+BULK_EDIT_MAX_ROWS = 500
+EDITABLE_COLUMNS = ['mould_no', 'description', 'location', 'hook', 'cavaties', 'part_wt', 'short_wt']
+TEXT_COLUMNS = ['mould_no', 'description', 'location', 'hook']
+
+
+# Function to convert an edited grid value to what's stored (trimmed text, plain numbers)
+def clean_value(column, value):
+    if value is None or value != value:
+        return '' if column in TEXT_COLUMNS else None
+    if column in TEXT_COLUMNS:
+        return str(value).strip()
+    if column == 'cavaties':
+        return int(value)
+    return round(float(value), 2)
+
+
+# Function to compare the grid before and after editing.
+# Returns only the changed cells: {product_id: {column: new value}}
+def diff_products(original, edited):
+    changes = {}
+    for before, after in zip(original, edited):
+        changed = {}
+        for column in EDITABLE_COLUMNS:
+            value = clean_value(column, after[column])
+            if value != clean_value(column, before[column]):
+                changed[column] = value
+        if changed:
+            changes[before['id']] = changed
+    return changes
+
+
+# Function to validate the changed products with the add/update form rules
+def validate_changes(original, changes):
+    errors = []
+    products = {product['id']: product for product in original}
+    for product_id, changed in changes.items():
+        merged = {column: clean_value(column, value) for column, value in products[product_id].items() if column in EDITABLE_COLUMNS}
+        merged.update(changed, id=product_id)
+        if merged['cavaties'] is None or merged['part_wt'] is None or merged['short_wt'] is None:
+            errors.append(f"{product_id}: Cavities and weights are required.")
+            continue
+        error = validate_product(merged)
+        if error:
+            errors.append(f"{product_id}: {error}")
+    return errors
+
+
+# Function to load the products of a selection, at most BULK_EDIT_MAX_ROWS of them.
+# Returns (products, truncated).
+def load_selection(search_query, filters):
+    products = next(iter_products(search_query, batch_size=BULK_EDIT_MAX_ROWS + 1, filters=filters), [])
+    return products[:BULK_EDIT_MAX_ROWS], len(products) > BULK_EDIT_MAX_ROWS
+
+
+def bulk_edit_page():
+    st.title("Bulk Edit")
+    st.caption("Edit many products at once, e.g. to re-rack a bay. Only the changed cells are saved, in one transaction.")
+    if 'bulk_edit_message' in st.session_state:
+        st.success(st.session_state.pop('bulk_edit_message'))
+
+    facet_counts = get_facet_counts()
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        locations = st.multiselect("Location", options=[value for value, _ in facet_counts.get('location', [])])
+    with col2:
+        search_query = st.text_input("Search (ID, Mould No., Description ...)").strip()
+    with col3:
+        hooks = st.multiselect("Hook", options=HOOK_OPTIONS)
+    filters = {}
+    if locations:
+        filters['location'] = locations
+    if hooks:
+        filters['hook'] = hooks
+
+    if not filters and not search_query:
+        st.info("Choose locations, hook types or a search to select the products to edit.")
+        return
+
+    # The grid edits rows by position, so its edits are compared with the rows it was
+    # shown with: those are loaded once per selection (and again after saving or on
+    # Reload) and kept in the session, not re-read on every rerun while other writes
+    # may add, remove or change matching products. Each load gets its own editor key,
+    # so edits made to one set of rows never carry over to another.
+    selection = (search_query, repr(filters))
+    saves = st.session_state.get('bulk_edit_saves', 0)
+    loaded = st.session_state.get('bulk_edit_selection')
+    if loaded is None or loaded['selection'] != selection or loaded['saves'] != saves:
+        if loaded is not None and loaded['selection'] != selection and st.session_state.get(loaded['editor_key'], {}).get('edited_rows'):
+            st.warning("The selection changed; unsaved edits to the previously selected products were discarded.")
+        try:
+            products, truncated = load_selection(search_query, filters)
+        except Exception as e:
+            st.error(f"Error loading products from SQLite: {e}")
+            return
+        loads = st.session_state.get('bulk_edit_loads', 0) + 1
+        st.session_state['bulk_edit_loads'] = loads
+        loaded = {'selection': selection, 'saves': saves, 'products': products, 'truncated': truncated,
+                  'editor_key': f"bulk_edit_{loads}"}
+        st.session_state['bulk_edit_selection'] = loaded
+    original = loaded['products']
+    if not original:
+        st.warning("No products match the selection.")
+        return
+    if loaded['truncated']:
+        st.warning(f"Showing the first {len(original)} matching products; narrow the selection to edit the rest.")
+    if st.button("Reload products", help="Show changes saved by others since the products were loaded. Unsaved edits are discarded."):
+        del st.session_state['bulk_edit_selection']
+        st.rerun()
+
+    edited = st.data_editor(
+        [{column: product[column] for column in ['id', *EDITABLE_COLUMNS]} for product in original],
+        key=loaded['editor_key'],
+        hide_index=True,
+        num_rows="fixed",
+        use_container_width=True,
+        disabled=['id'],
+        column_config={
+            'id': st.column_config.TextColumn("Product ID"),
+            'mould_no': st.column_config.TextColumn("Mould No.", max_chars=100),
+            'description': st.column_config.TextColumn("Description", max_chars=1000),
+            'location': st.column_config.TextColumn("Location", max_chars=100),
+            'hook': st.column_config.SelectboxColumn("Hook", options=HOOK_OPTIONS, required=True),
+            'cavaties': st.column_config.NumberColumn("Cavities", min_value=1, max_value=100, step=1, required=True),
+            'part_wt': st.column_config.NumberColumn("Part Weight (g)", min_value=0.0, step=0.1, format="%.2f", required=True),
+            'short_wt': st.column_config.NumberColumn("Shot Weight (g)", min_value=0.0, step=0.1, format="%.2f", required=True),
+        },
+    )
+
+    changes = diff_products(original, edited)
+    st.write(f"**{len(changes)}** products changed.")
+    if st.button("Save Changes", type="primary", disabled=not changes):
+        errors = validate_changes(original, changes)
+        if errors:
+            for error in errors:
+                st.error(error)
+            return
+        updated = update_products_in_db(changes)
+        if updated is not None:
+            st.session_state['bulk_edit_saves'] = st.session_state.get('bulk_edit_saves', 0) + 1
+            message = f"Saved {updated} products."
+            if updated < len(changes):
+                message += f" {len(changes) - updated} were deleted by someone else and not saved."
+            st.session_state['bulk_edit_message'] = message
+            st.rerun()
+
+
+if __name__ == "__main__":
+    bulk_edit_page()
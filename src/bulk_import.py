@@ -0,0 +1,90 @@
+import csv
+import io
+import streamlit as st
+from utils import PRODUCT_COLUMNS
+from catalog_import import DEFAULT_BATCH_SIZE, import_products_from_bytes, resolve_column_map
+
+st.set_page_config(page_title="Bulk Import", page_icon="📦", layout="centered")
+
+FIELD_LABELS = {
+    'id': "Product ID*",
+    'mould_no': "Mould Number",
+    'description': "Description",
+    'image_url': "Image URL",
+    'location': "Location",
+    'hook': "Hook",
+    'cavaties': "Cavities",
+    'part_wt': "Part Weight (g)",
+    'short_wt': "Shot Weight (g)",
+}
+
+
+# Read only the header row of an uploaded CSV
+def read_csv_header(uploaded_file):
+    uploaded_file.seek(0)
+    text_file = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+    try:
+        return next(csv.reader(text_file), [])
+    finally:
+        text_file.detach()
+        uploaded_file.seek(0)
+
+
+def bulk_import_page():
+    st.title("Bulk Import Products")
+    st.write("Upload a CSV file with one product per row. Existing products with the same ID have their mapped fields updated.")
+
+    uploaded_csv = st.file_uploader("Upload CSV", type=["csv"])
+    if uploaded_csv is None:
+        return
+
+    try:
+        header = read_csv_header(uploaded_csv)
+    except UnicodeDecodeError:
+        st.error("The file must be UTF-8 encoded.")
+        return
+    if not header:
+        st.error("The file is empty or has no header row.")
+        return
+
+    st.subheader("Column Mapping")
+    detected = {field: column for column, field in resolve_column_map(header).items()}
+    skip_option = "(not imported)"
+    column_map = {}
+    for field in PRODUCT_COLUMNS:
+        options = [skip_option] + header
+        default = detected.get(field)
+        selected = st.selectbox(FIELD_LABELS[field], options=options,
+                                index=options.index(default) if default in options else 0,
+                                key=f"map_{field}")
+        if selected != skip_option:
+            column_map[selected] = field
+
+    batch_size = st.number_input("Rows per transaction", min_value=50, max_value=10000,
+                                 value=DEFAULT_BATCH_SIZE, step=50)
+
+    if st.button("Import", type="primary", disabled='id' not in column_map.values()):
+        # Only mapped columns are imported
+        header_map = {column: column_map.get(column, '') for column in header}
+        total_bytes = max(uploaded_csv.size, 1)
+        progress_bar = st.progress(0.0, text="Importing...")
+
+        def update_progress(report):
+            fraction = min(uploaded_csv.tell() / total_bytes, 1.0)
+            progress_bar.progress(fraction, text=f"Read {report.rows_read} rows, imported {report.rows_imported}, failed {report.rows_failed}")
+
+        uploaded_csv.seek(0)
+        report = import_products_from_bytes(uploaded_csv, header_map, int(batch_size), update_progress)
+        progress_bar.progress(1.0, text="Import finished.")
+
+        if report.rows_imported:
+            st.success(f"Imported {report.rows_imported} of {report.rows_read} rows.")
+        if report.rows_failed:
+            st.error(f"{report.rows_failed} rows could not be imported.")
+            st.dataframe([{"Row": row_no, "Error": message} for row_no, message in report.errors],
+                         use_container_width=True)
+            if report.rows_failed > len(report.errors):
+                st.caption(f"Showing the first {len(report.errors)} errors.")
+
+if __name__ == "__main__":
+    bulk_import_page()
@@ -0,0 +1,137 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+
+from utils import HOOK_OPTIONS, PRODUCT_COLUMNS, iter_products
+
+DEFAULT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {
+    'csv': {'extension': '.csv', 'mime': 'text/csv'},
+    'jsonl': {'extension': '.jsonl', 'mime': 'application/x-ndjson'},
+    'parquet': {'extension': '.parquet', 'mime': 'application/vnd.apache.parquet'},
+}
+
+
+def write_csv(batches, binary_out):
+    text_out = io.TextIOWrapper(binary_out, encoding='utf-8', newline='')
+    try:
+        writer = csv.DictWriter(text_out, fieldnames=PRODUCT_COLUMNS)
+        writer.writeheader()
+        for batch in batches:
+            writer.writerows(batch)
+        text_out.flush()
+    finally:
+        text_out.detach()
+
+
+def write_jsonl(batches, binary_out):
+    for batch in batches:
+        binary_out.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch).encode('utf-8'))
+
+
+# Each batch becomes one Parquet row group, so the writer never holds more than a batch
+def write_parquet(batches, binary_out):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires the 'pyarrow' package.") from None
+    schema = pa.schema([
+        ('id', pa.string()),
+        ('mould_no', pa.string()),
+        ('description', pa.string()),
+        ('image_url', pa.string()),
+        ('location', pa.string()),
+        ('hook', pa.string()),
+        ('cavaties', pa.int64()),
+        ('part_wt', pa.float64()),
+        ('short_wt', pa.float64()),
+    ])
+    with pq.ParquetWriter(binary_out, schema) as writer:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'parquet': write_parquet,
+}
+
+
+# Stream the catalog (or the matches of `search_query` and/or facet `filters`) to a
+# binary file object. Returns the number of products written.
+def export_products(binary_out, fmt='csv', search_query=None, batch_size=DEFAULT_BATCH_SIZE, filters=None):
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format '{fmt}', expected one of: {', '.join(WRITERS)}")
+    exported = 0
+
+    def counted_batches():
+        nonlocal exported
+        for batch in iter_products(search_query, batch_size, filters):
+            exported += len(batch)
+            yield batch
+
+    WRITERS[fmt](counted_batches(), binary_out)
+    return exported
+
+
+# Parse a "MIN:MAX" weight range for the CLI; either end may be left empty
+def parse_range(text):
+    low, sep, high = text.partition(':')
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected MIN:MAX, got {text!r}")
+    try:
+        return (float(low) if low else None, float(high) if high else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid range {text!r}") from None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the product catalog.")
+    parser.add_argument("output", help="Output file path, or '-' for stdout")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS),
+                        help="Output format (default: inferred from the file extension, else csv)")
+    parser.add_argument("--search", help="Only export products matching this search query")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Rows fetched per batch (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--location", action="append",
+                        help="Only export products at this location (repeatable)")
+    parser.add_argument("--hook", action="append", choices=HOOK_OPTIONS,
+                        help="Only export products with this hook type (repeatable)")
+    parser.add_argument("--cavities", action="append", type=int,
+                        help="Only export products with this many cavities (repeatable)")
+    parser.add_argument("--part-wt", type=parse_range, metavar="MIN:MAX",
+                        help="Only export products whose part weight is in this range, e.g. 1.5:3 or 2:")
+    parser.add_argument("--short-wt", type=parse_range, metavar="MIN:MAX",
+                        help="Only export products whose short weight is in this range")
+    args = parser.parse_args(argv)
+
+    filters = {
+        'location': args.location,
+        'hook': args.hook,
+        'cavaties': args.cavities,
+        'part_wt': args.part_wt,
+        'short_wt': args.short_wt,
+    }
+
+    fmt = args.format
+    if fmt is None:
+        extension = os.path.splitext(args.output)[1].lower()
+        fmt = next((name for name, info in EXPORT_FORMATS.items() if info['extension'] == extension), 'csv')
+
+    if args.output == '-':
+        exported = export_products(sys.stdout.buffer, fmt, args.search, args.batch_size, filters)
+        sys.stdout.buffer.flush()
+    else:
+        with open(args.output, 'wb') as f:
+            exported = export_products(f, fmt, args.search, args.batch_size, filters)
+    print(f"Exported {exported} products as {fmt}.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
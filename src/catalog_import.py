@@ -0,0 +1,190 @@
+import argparse
+import csv
+import io
+import math
+import sys
+from itertools import islice
+
+from utils import PRODUCT_COLUMNS, upsert_products, validate_product
+
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+# Common alternative CSV headers for product fields
+COLUMN_ALIASES = {
+    'product_id': 'id',
+    'mould': 'mould_no',
+    'mould_number': 'mould_no',
+    'rack': 'location',
+    'cavities': 'cavaties',
+    'part_weight': 'part_wt',
+    'shot_wt': 'short_wt',
+    'shot_weight': 'short_wt',
+}
+
+
+# Result of an import run: counts plus the first MAX_REPORTED_ERRORS row errors
+class ImportReport:
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_failed = 0
+        self.errors = []  # (data row number, message); 0 means the file itself
+
+    def add_error(self, row_no, message):
+        self.rows_failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_no, message))
+
+
+# Build a {csv column: product field} mapping from the header row.
+# Explicit entries in `column_map` win over exact names and known aliases.
+def resolve_column_map(header, column_map=None):
+    column_map = column_map or {}
+    resolved = {}
+    for column in header:
+        key = column.strip()
+        if column in column_map or key in column_map:
+            target = column_map.get(column, column_map.get(key))
+        elif key.lower() in PRODUCT_COLUMNS:
+            target = key.lower()
+        else:
+            target = COLUMN_ALIASES.get(key.lower())
+        if target in PRODUCT_COLUMNS:
+            resolved[column] = target
+    return resolved
+
+
+# Parse a numeric cell, rejecting inf/nan (float() accepts them). Raises ValueError.
+def parse_number(field, text):
+    try:
+        value = float(text)
+    except ValueError:
+        raise ValueError(f"Invalid number in '{field}': {text!r}") from None
+    if not math.isfinite(value):
+        raise ValueError(f"Invalid number in '{field}': {text!r}")
+    return value
+
+
+# Parse a whole-number cell ("4" or "4.0"), rejecting fractions instead of truncating
+# them. Raises ValueError.
+def parse_integer(field, text):
+    value = parse_number(field, text)
+    if not value.is_integer():
+        raise ValueError(f"Invalid whole number in '{field}': {text!r}")
+    return int(value)
+
+
+# Convert one CSV record into a validated product dict. Raises ValueError.
+def parse_product_row(record, resolved_map):
+    raw = {field: (record.get(column) or '').strip() for column, field in resolved_map.items()}
+    cavaties = parse_integer('cavaties', raw['cavaties']) if raw.get('cavaties') else 1
+    part_wt = round(parse_number('part_wt', raw['part_wt']), 2) if raw.get('part_wt') else 0.0
+    short_wt = round(parse_number('short_wt', raw['short_wt']), 2) if raw.get('short_wt') else 0.0
+    hook = raw.get('hook') or 'Plastic'
+    product = {
+        'id': raw.get('id', ''),
+        'mould_no': raw.get('mould_no', ''),
+        'description': raw.get('description', ''),
+        'image_url': raw.get('image_url', ''),
+        'location': raw.get('location', ''),
+        'hook': hook.capitalize(),
+        'cavaties': cavaties,
+        'part_wt': part_wt,
+        'short_wt': short_wt,
+    }
+    validation_error = validate_product(product)
+    if validation_error:
+        raise ValueError(validation_error)
+    return product
+
+
+# Stream a CSV text file and upsert it in batches, one transaction per batch.
+# Only `batch_size` rows are held in memory at a time. Products that already
+# exist only have the fields present in the file updated.
+# `on_progress(report)` is called after every batch.
+def import_products(text_file, column_map=None, batch_size=DEFAULT_BATCH_SIZE, on_progress=None):
+    report = ImportReport()
+    reader = csv.DictReader(text_file)
+    if not reader.fieldnames:
+        report.add_error(0, "The file is empty or has no header row.")
+        return report
+    resolved_map = resolve_column_map(reader.fieldnames, column_map)
+    if 'id' not in resolved_map.values():
+        report.add_error(0, "No column maps to the product ID ('id').")
+        return report
+
+    while True:
+        chunk = list(islice(reader, batch_size))
+        if not chunk:
+            break
+        batch, batch_rows = [], []
+        for record in chunk:
+            report.rows_read += 1
+            try:
+                batch.append(parse_product_row(record, resolved_map))
+                batch_rows.append(report.rows_read)
+            except ValueError as e:
+                report.add_error(report.rows_read, str(e))
+        if batch:
+            try:
+                report.rows_imported += upsert_products(batch, update_fields=list(resolved_map.values()))
+            except Exception as e:
+                for row_no in batch_rows:
+                    report.add_error(row_no, f"Database error: {e}")
+        if on_progress:
+            on_progress(report)
+    return report
+
+
+# Import a CSV from raw bytes (e.g. a Streamlit upload) without decoding it all at once
+def import_products_from_bytes(binary_file, column_map=None, batch_size=DEFAULT_BATCH_SIZE, on_progress=None):
+    text_file = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+    try:
+        return import_products(text_file, column_map, batch_size, on_progress)
+    finally:
+        text_file.detach()
+
+
+def parse_mapping_args(mappings):
+    column_map = {}
+    for mapping in mappings or []:
+        source, sep, target = mapping.partition('=')
+        if not sep or target not in PRODUCT_COLUMNS:
+            raise argparse.ArgumentTypeError(f"Invalid mapping '{mapping}', expected CSV_COLUMN=FIELD with FIELD one of {', '.join(PRODUCT_COLUMNS)}")
+        column_map[source] = target
+    return column_map
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import products from a CSV file.")
+    parser.add_argument("csv_file", help="Path to the CSV file to import")
+    parser.add_argument("--map", dest="mappings", action="append", metavar="CSV_COLUMN=FIELD",
+                        help="Map a CSV column to a product field (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Rows per transaction (default: {DEFAULT_BATCH_SIZE})")
+    args = parser.parse_args(argv)
+
+    try:
+        column_map = parse_mapping_args(args.mappings)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    def print_progress(report):
+        print(f"\rRead {report.rows_read} rows, imported {report.rows_imported}, failed {report.rows_failed}",
+              end="", file=sys.stderr, flush=True)
+
+    with open(args.csv_file, newline='', encoding='utf-8-sig') as f:
+        report = import_products(f, column_map, args.batch_size, print_progress)
+    print(file=sys.stderr)
+
+    for row_no, message in report.errors:
+        print(f"Row {row_no}: {message}")
+    if report.rows_failed > len(report.errors):
+        print(f"... and {report.rows_failed - len(report.errors)} more errors")
+    print(f"Imported {report.rows_imported} of {report.rows_read} rows.")
+    return 1 if report.rows_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import glob
+import os
+import re
+import threading
+import time
+
+# --- Catalog snapshots ---
+# The cached catalog published as Arrow IPC files named by database and data
+# version. Server processes memory-map the file for the current version instead
+# of querying SQLite, so the text columns live once in the OS page cache, shared
+# by every process, and a reload after a write is a remap. Files are written
+# under a temporary name and renamed, so readers never see a partial snapshot.
+# pyarrow is imported only when snapshots are used, keeping it off the startup path.
+SNAPSHOT_KEEP = 3
+SNAPSHOT_TEMP_MAX_AGE = 600  # seconds after which a leftover temporary file is removed
+SNAPSHOT_NAME_RE = re.compile(r'^catalog-(\d+)-(\d+)\.arrow$')
+
+
+def snapshot_path(snapshot_dir, database_id, version):
+    return os.path.join(snapshot_dir, f"catalog-{database_id}-{version}.arrow")
+
+
+def write_snapshot(df, path):
+    import pyarrow as pa
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    temp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        # Owner read/write only, like the database the catalog comes from
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Memory-map a snapshot as a DataFrame (dtypes restored from the pandas metadata).
+# String columns keep pointing into the mapping; returns None if there is no such file.
+def read_snapshot(path):
+    import pyarrow as pa
+    try:
+        source = pa.memory_map(path, 'r')
+    except FileNotFoundError:
+        return None
+    return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+# Remove all but the newest `keep` snapshots of `database_id`, snapshots of other
+# databases and abandoned temporary files. Processes still mapping a removed file
+# keep reading it until they remap.
+def prune_snapshots(snapshot_dir, database_id, keep=SNAPSHOT_KEEP):
+    current = []
+    for path in glob.glob(os.path.join(snapshot_dir, "catalog-*")):
+        match = SNAPSHOT_NAME_RE.match(os.path.basename(path))
+        try:
+            if match and int(match.group(1)) == database_id:
+                current.append((int(match.group(2)), path))
+            elif match or time.time() - os.path.getmtime(path) > SNAPSHOT_TEMP_MAX_AGE:
+                os.remove(path)
+        except OSError:
+            pass
+    for _, path in sorted(current)[:-keep]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
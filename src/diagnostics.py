@@ -0,0 +1,135 @@
+import os
+import streamlit as st
+from metrics import METRICS_HOST, METRICS_PORT, registry, start_metrics_server
+from profiler import PROFILE_SESSION_KEY, PROFILES_DIR, PROFILING_ENABLED, list_captures
+from utils import get_db_size_bytes, get_data_version
+
+st.set_page_config(page_title="Diagnostics", page_icon="📦", layout="wide")
+
+
+def format_ms(seconds):
+    return f"{seconds * 1000:.1f} ms"
+
+
+# Function to render the metrics recorded by this server process
+def diagnostics_page():
+    st.title("Diagnostics")
+    st.caption("Metrics recorded by this server process since it started.")
+    operations, counters, gauges = registry.snapshot()
+
+    col_db, col_version, col_endpoint = st.columns(3)
+    col_db.metric("Database size", f"{get_db_size_bytes() / (1024 * 1024):.1f} MB")
+    col_version.metric("Data version", get_data_version())
+    address = start_metrics_server()
+    col_endpoint.metric("Metrics endpoint", f"http://{address[0]}:{address[1]}/metrics" if address else "not running")
+    if not address and METRICS_PORT:
+        st.caption(f"Port {METRICS_HOST}:{METRICS_PORT} is in use, probably by another app process.")
+
+    st.subheader("Operations")
+    if operations:
+        st.dataframe(
+            [
+                {
+                    "Operation": name,
+                    "Calls": stats.count,
+                    "Errors": stats.errors,
+                    "Average": format_ms(stats.total_seconds / stats.count) if stats.count else "-",
+                    "p50 (approx.)": format_ms(stats.quantile(0.5)),
+                    "p95 (approx.)": format_ms(stats.quantile(0.95)),
+                    "Total time": f"{stats.total_seconds:.2f} s",
+                }
+                for name, stats in sorted(operations.items())
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+    else:
+        st.info("No operations recorded yet.")
+
+    st.subheader("Caches")
+    cache_stats = {}
+    for (name, labels), value in counters.items():
+        labels = dict(labels)
+        if name == "cache_requests":
+            cache_stats.setdefault(labels['cache'], {'hit': 0, 'miss': 0})[labels['result']] += value
+    if cache_stats:
+        st.dataframe(
+            [
+                {
+                    "Cache": cache,
+                    "Hits": stats['hit'],
+                    "Misses": stats['miss'],
+                    "Hit rate": f"{stats['hit'] / (stats['hit'] + stats['miss']):.1%}",
+                }
+                for cache, stats in sorted(cache_stats.items())
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+    else:
+        st.info("No cache lookups recorded yet.")
+
+    st.subheader("Gauges")
+    st.dataframe(
+        [{"Metric": name, "Value": value} for name, (_, _, value) in sorted(gauges.items())],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    with st.expander("Prometheus output"):
+        st.code(registry.render_prometheus(), language="text")
+
+    display_profiling()
+
+
+def set_session_profiling():
+    st.session_state[PROFILE_SESSION_KEY] = st.session_state['profile_toggle']
+
+
+# Function to switch page profiling on for this session and show recent captures
+def display_profiling():
+    st.subheader("Profiling")
+    if PROFILING_ENABLED:
+        st.info("Profiling is on for all sessions (PRODUCTS_PROFILE is set).")
+    else:
+        st.toggle("Profile my page runs", value=st.session_state.get(PROFILE_SESSION_KEY, False),
+                  key="profile_toggle", on_change=set_session_profiling,
+                  help="Capture a CPU profile and allocation report of every Product List, Add Product "
+                       "and Update Product run in this session. Turn off again when done: it slows pages down.")
+
+    captures = list_captures()
+    if not captures:
+        st.caption(f"No captures yet. They are saved to {PROFILES_DIR}.")
+        return
+    st.dataframe(
+        [
+            {
+                "Started": capture['started'],
+                "Page": capture['page'],
+                "Wall time": format_ms(capture['wall_seconds']),
+                "Peak traced memory": f"{capture['peak_traced_bytes'] / (1024 * 1024):.1f} MB",
+                "Outcome": capture['outcome'],
+            }
+            for capture in captures
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    selected = st.selectbox("Show capture", options=range(len(captures)),
+                            format_func=lambda i: f"{captures[i]['started']} {captures[i]['page']}")
+    capture = captures[selected]
+    st.markdown("**Top functions by cumulative time**")
+    st.code(capture['cpu_report'], language="text")
+    st.markdown("**Top allocations still alive at the end of the run**")
+    st.dataframe(capture['allocations'], hide_index=True, use_container_width=True)
+    try:
+        with open(capture['profile_path'], 'rb') as f:
+            st.download_button("Download .prof (for snakeviz / pstats)", f.read(),
+                               file_name=os.path.basename(capture['profile_path']))
+    except OSError:
+        st.caption("The profile file of this capture has been removed.")
+
+
+if __name__ == "__main__":
+    diagnostics_page()
@@ -0,0 +1,36 @@
+import argparse
+import sys
+
+from utils import IMAGE_GC_GRACE_PERIOD, get_orphaned_images, index_unreferenced_image_files, sweep_orphaned_images
+
+
+# Remove stored images no product has referenced for the grace period, e.g. from cron:
+#   python src/image_gc.py --grace-hours 24
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete product images that are no longer referenced.")
+    parser.add_argument("--grace-hours", type=float, default=IMAGE_GC_GRACE_PERIOD / 3600,
+                        help=f"Only remove images unreferenced for at least this long (default: {IMAGE_GC_GRACE_PERIOD / 3600:g})")
+    parser.add_argument("--scan", action="store_true",
+                        help="First walk the images directory and index files the database doesn't know about")
+    parser.add_argument("--dry-run", action="store_true", help="List the images that would be removed")
+    args = parser.parse_args(argv)
+    grace_period = args.grace_hours * 3600
+
+    if args.scan:
+        registered = index_unreferenced_image_files()
+        print(f"Indexed {registered} unreferenced images found on disk.", file=sys.stderr)
+
+    if args.dry_run:
+        orphans = get_orphaned_images(grace_period, limit=-1)
+        for image_url, _ in orphans:
+            print(image_url)
+        print(f"{len(orphans)} images would be removed.", file=sys.stderr)
+        return 0
+
+    removed, freed = sweep_orphaned_images(grace_period)
+    print(f"Removed {removed} images, freed {freed / (1024 * 1024):.1f} MB.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
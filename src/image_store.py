@@ -0,0 +1,195 @@
+import functools
+import hashlib
+import io
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+# --- Image storage ---
+# Uploads are stored once per distinct content under their SHA-256 digest, in a
+# sharded layout (images/ab/cd/<digest>_<rendition>.<ext>), as a set of
+# aspect-preserving renditions. image_url points at the largest JPEG rendition;
+# smaller ones are found next to it by name.
+# This module has no Streamlit dependency so image worker processes can import it cheaply;
+# Pillow is only imported once an image is actually decoded or drawn.
+IMAGE_RENDITIONS = {  # name: bounding box, smallest first
+    'thumb': (200, 200),
+    'detail': (800, 800),
+}
+LARGEST_RENDITION = max(IMAGE_RENDITIONS, key=lambda name: IMAGE_RENDITIONS[name])
+RENDITION_FILENAME_RE = re.compile(r'^([0-9a-f]{64})_([a-z]+)\.(jpg|webp)$')
+IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+# Whether this Pillow build can encode WebP renditions
+@functools.lru_cache(maxsize=None)
+def webp_enabled():
+    from PIL import features
+    return features.check('webp')
+
+
+def image_digest(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def image_shard_dir(images_dir, digest):
+    return os.path.join(images_dir, digest[:2], digest[2:4])
+
+
+# Absolute path of the file image_url points at for a given digest
+def stored_image_path(images_dir, digest):
+    return os.path.join(image_shard_dir(images_dir, digest), f"{digest}_{LARGEST_RENDITION}.jpg")
+
+
+# Open an image, apply its EXIF orientation and convert to RGB. Raises on invalid images.
+def open_image(image_bytes):
+    from PIL import Image, ImageOps
+    image = Image.open(io.BytesIO(image_bytes))
+    image = ImageOps.exif_transpose(image)
+    return image.convert("RGB")
+
+
+# Encode every rendition of an image: {filename suffix: encoded bytes}
+def build_image_renditions(image_bytes):
+    from PIL import Image
+    image = open_image(image_bytes)
+    renditions = {}
+    # Largest first, so each rendition is downscaled from the previous one
+    for name, size in sorted(IMAGE_RENDITIONS.items(), key=lambda item: item[1], reverse=True):
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=85, optimize=True, progressive=True)
+        renditions[f"{name}.jpg"] = buffer.getvalue()
+        if webp_enabled():
+            buffer = io.BytesIO()
+            image.save(buffer, format="WEBP", quality=80, method=4)
+            renditions[f"{name}.webp"] = buffer.getvalue()
+    return renditions
+
+
+# Write bytes to `path` via a temporary file so readers never see partial images
+def write_file_atomically(path, data):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# Decode, resize and write all renditions unless this content is already stored.
+# Returns the absolute path of the largest JPEG rendition. Raises on invalid images.
+def store_image(image_bytes, images_dir):
+    digest = image_digest(image_bytes)
+    image_path = stored_image_path(images_dir, digest)
+    if os.path.exists(image_path):
+        return image_path
+    renditions = build_image_renditions(image_bytes)
+    shard_dir = image_shard_dir(images_dir, digest)
+    os.makedirs(shard_dir, exist_ok=True)
+    # Write the referenced rendition last: once it exists, the set is complete
+    for suffix, data in sorted(renditions.items(), key=lambda item: item[0] == f"{LARGEST_RENDITION}.jpg"):
+        write_file_atomically(os.path.join(shard_dir, f"{digest}_{suffix}"), data)
+    return image_path
+
+
+# Pick the smallest stored rendition of an image file that still covers `width` pixels,
+# preferring WebP when available. Files that aren't content-addressed are returned as is.
+def pick_rendition(absolute_path, width):
+    match = RENDITION_FILENAME_RE.match(os.path.basename(absolute_path))
+    if not match:
+        return absolute_path
+    return pick_stored_rendition(os.path.dirname(absolute_path), match.group(1), width) or absolute_path
+
+
+# Renditions are written before the file image_url references and never change
+# afterwards, so the choice can be memoized per digest and width.
+@functools.lru_cache(maxsize=4096)
+def pick_stored_rendition(shard_dir, digest, width):
+    renditions = sorted(IMAGE_RENDITIONS.items(), key=lambda item: item[1])
+    fitting = [name for name, size in renditions if max(size) >= width] or [renditions[-1][0]]
+    for name in fitting:
+        for extension in (('webp', 'jpg') if webp_enabled() else ('jpg',)):
+            candidate = os.path.join(shard_dir, f"{digest}_{name}.{extension}")
+            if os.path.exists(candidate):
+                return candidate
+    return None
+
+
+# Every file belonging to a stored image: all renditions of a content-addressed
+# image (whether or not they exist), or just the file itself for older uploads
+def image_file_paths(absolute_path):
+    match = RENDITION_FILENAME_RE.match(os.path.basename(absolute_path))
+    if not match:
+        return [absolute_path]
+    shard_dir, digest = os.path.dirname(absolute_path), match.group(1)
+    return [os.path.join(shard_dir, f"{digest}_{name}.{extension}")
+            for name in IMAGE_RENDITIONS for extension in ('jpg', 'webp')]
+
+
+# Locally rendered placeholder (PNG) for products without a usable image
+@functools.lru_cache(maxsize=16)
+def placeholder_image(text, size=(200, 200)):
+    from PIL import Image, ImageDraw
+    image = Image.new("RGB", size, (229, 231, 235))
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = draw.textbbox((0, 0), text)
+    position = ((size[0] - (right - left)) / 2, (size[1] - (bottom - top)) / 2)
+    draw.text(position, text, fill=(107, 114, 128))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+# Size-bounded LRU cache of image file contents, validated against each file's
+# mtime and size so replaced files are re-read. One os.stat per lookup.
+class ImageBytesCache:
+    def __init__(self, max_bytes=IMAGE_CACHE_MAX_BYTES, on_lookup=None):
+        self.max_bytes = max_bytes
+        self.on_lookup = on_lookup  # called with True (hit) or False (miss)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # path: (mtime_ns, size, data)
+        self._lock = threading.Lock()
+
+    # Returns the file's bytes, or None if it can't be read
+    def get(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                hit = True
+            else:
+                self.misses += 1
+                hit = False
+        if self.on_lookup is not None:
+            self.on_lookup(hit)
+        if hit:
+            return entry[2]
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) <= self.max_bytes:
+            with self._lock:
+                previous = self._entries.pop(path, None)
+                if previous is not None:
+                    self.total_bytes -= len(previous[2])
+                self._entries[path] = (stat.st_mtime_ns, stat.st_size, data)
+                self.total_bytes += len(data)
+                while self.total_bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.total_bytes -= len(evicted[2])
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
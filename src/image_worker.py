@@ -0,0 +1,82 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from image_store import store_image
+from metrics import registry as metrics_registry
+
+IMAGE_WORKER_PROCESSES = max(1, min(2, (os.cpu_count() or 1) - 1))
+# At most this many images are queued or processing; further submissions wait
+IMAGE_WORKER_MAX_PENDING = 8
+IMAGE_WORKER_SUBMIT_TIMEOUT = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+# Bounded process pool for decoding/resizing uploads off the Streamlit script
+# thread (and outside this process's GIL). The pool starts on first use.
+class ImageWorker:
+    def __init__(self, processes=IMAGE_WORKER_PROCESSES, max_pending=IMAGE_WORKER_MAX_PENDING):
+        self.processes = processes
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # "spawn" avoids forking a multi-threaded server process
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    # Queue an image for processing. `on_done(image_path, error)` runs in a background
+    # thread of this process when it finishes. Returns False if the queue stayed full
+    # for `timeout` seconds (backpressure). Each job's time from submission to done
+    # (waiting for a worker, decoding, resizing, writing) is recorded as "image_processing".
+    def submit(self, image_bytes, images_dir, on_done, timeout=IMAGE_WORKER_SUBMIT_TIMEOUT):
+        if not self._slots.acquire(timeout=timeout):
+            return False
+        start = time.perf_counter()
+        try:
+            try:
+                future = self._get_executor().submit(store_image, image_bytes, images_dir)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool and retry once
+                self.shutdown(wait=False)
+                future = self._get_executor().submit(store_image, image_bytes, images_dir)
+        except Exception:
+            self._slots.release()
+            raise
+
+        def finished(future):
+            self._slots.release()
+            try:
+                image_path, error = future.result(), None
+            except Exception as e:
+                image_path, error = None, e
+            metrics_registry.observe("image_processing", time.perf_counter() - start, error is not None)
+            try:
+                on_done(image_path, error)
+            except Exception:
+                logger.exception("Image worker completion callback failed")
+
+        future.add_done_callback(finished)
+        return True
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+image_worker = ImageWorker()
+atexit.register(image_worker.shutdown)
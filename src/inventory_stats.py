@@ -0,0 +1,74 @@
+import streamlit as st
+from utils import get_inventory_summary, load_data
+
+st.set_page_config(page_title="Statistics", page_icon="📦", layout="wide")
+
+
+WEIGHT_BANDS = 20
+WEIGHT_COLUMNS = {"Part Weight": "part_wt", "Shot Weight": "short_wt"}
+
+
+def format_weight(value):
+    return "-" if value is None else f"{value:,.1f} g"
+
+
+def summary_table(rows, label):
+    return [
+        {
+            label: row['value'] or "(none)",
+            "Products": row['product_count'],
+            "Total Cavities": row['total_cavities'],
+            "Avg. Part Weight": format_weight(row['avg_part_wt']),
+            "Avg. Shot Weight": format_weight(row['avg_short_wt']),
+        }
+        for row in rows
+    ]
+
+
+# Number of products in each of `bands` equal-width bands of a weight column
+def weight_distribution(catalog, column, bands=WEIGHT_BANDS):
+    import pandas as pd
+    weights = catalog[column].dropna()
+    if weights.empty:
+        return []
+    counts = pd.cut(weights, bins=bands, include_lowest=True).value_counts(sort=False)
+    return [
+        {"From (g)": round(max(band.left, 0.0), 1), "Products": int(count)}
+        for band, count in counts.items()
+    ]
+
+
+# Function to show inventory totals per rack location and hook type.
+# Totals come from the trigger-maintained summary table; only the weight
+# distribution reads the products, from the shared catalog (see load_data).
+def inventory_stats_page():
+    st.title("Inventory Statistics")
+    summary = get_inventory_summary()
+
+    if not summary['all']:
+        st.info("No products found. Please add some products using the 'Add New Product' page.")
+        return
+
+    totals = summary['all'][0]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Products", f"{totals['product_count']:,}")
+    col2.metric("Total Cavities", f"{totals['total_cavities']:,}")
+    col3.metric("Avg. Part Weight", format_weight(totals['avg_part_wt']))
+    col4.metric("Avg. Shot Weight", format_weight(totals['avg_short_wt']))
+
+    tab_location, tab_hook, tab_weight = st.tabs(["By Location", "By Hook Type", "Weight Distribution"])
+    with tab_location:
+        table = summary_table(summary['location'], "Location")
+        st.bar_chart(table, x="Location", y="Products")
+        st.dataframe(table, hide_index=True, use_container_width=True)
+    with tab_hook:
+        st.dataframe(summary_table(summary['hook'], "Hook"), hide_index=True, use_container_width=True)
+    with tab_weight:
+        label = st.radio("Weight", list(WEIGHT_COLUMNS), horizontal=True)
+        distribution = weight_distribution(load_data(), WEIGHT_COLUMNS[label])
+        if distribution:
+            st.bar_chart(distribution, x="From (g)", y="Products")
+
+
+if __name__ == "__main__":
+    inventory_stats_page()
@@ -1,10 +1,16 @@
 import streamlit as st
-import pandas as pd
-import os
-from utils import load_data, delete_product_from_db
+import tempfile
+from catalog_export import EXPORT_FORMATS, export_products
+from image_store import placeholder_image
+from metrics import instrument
+from profiler import profile_page
+from utils import count_products, fuzzy_search_products, get_facet_counts, get_pending_image_ids, get_range_bounds, get_products_page, load_image_bytes, search_products, delete_product_from_db
 
 st.set_page_config(page_title="Product List", page_icon="📦", layout="wide")
 
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+LIST_IMAGE_WIDTH = 200
+
 
 # Function to delete a product and manage state/rerun
 def delete_product_and_clear_state(product_id_to_delete):
@@ -20,6 +26,8 @@ def delete_product_and_clear_state(product_id_to_delete):
         del st.session_state['confirm_delete_id']
     st.rerun()
 
+@profile_page("display_products")
+@instrument("display_products")
 def display_products():
 
     st.title("Product Information Display")
@@ -39,80 +47,251 @@ def display_products():
                         del st.session_state['confirm_delete_id']
                     st.rerun()
 
-    df = load_data()
+    total_products = count_products()
 
-    if df.empty:
+    if total_products == 0:
         st.info("No products found. Please add some products using the 'Add New Product' page.")
         return
 
-    search_query = st.text_input("Search products (ID, Mould No., Description ...)", "").lower()
+    filters = display_filters()
+    if filters:
+        total_products = count_products(filters)
+
+    search_query = st.text_input("Search products (ID, Mould No., Description, Location ...)", "").strip()
+
+    display_export_controls(search_query, filters)
+
+    page_size = st.selectbox("Products per page", options=PAGE_SIZE_OPTIONS, index=1,
+                             key="page_size", on_change=reset_pagination)
 
     if search_query:
-        # Ensure that you're converting to string and handling NaN values
-        df_filtered = df[
-            df.apply(lambda row: row.astype(str).str.lower().str.contains(search_query, na=False).any(), axis=1)
-        ]
+        display_search_results(search_query, page_size, filters)
+    elif total_products == 0:
+        st.warning("No products match the selected filters.")
     else:
-        df_filtered = df
+        display_products_page(total_products, page_size, filters)
+
+
+# Function to render the sidebar facet filters and return the active ones.
+# Option counts come from the facet_counts table, so they cost no catalog scan.
+def display_filters():
+    facet_counts = get_facet_counts()
+    range_bounds = get_range_bounds()
+    filters = {}
+    with st.sidebar:
+        st.header("Filters")
+        for column, label in (('location', "Location"), ('hook', "Hook"), ('cavaties', "Cavities")):
+            counts = dict(facet_counts.get(column, []))
+            selected = st.multiselect(label, options=list(counts), key=f"filter_{column}",
+                                      format_func=lambda value, counts=counts: f"{value} ({counts[value]})",
+                                      on_change=reset_pagination)
+            if selected:
+                filters[column] = selected
+        for column, label in (('part_wt', "Part Weight (g)"), ('short_wt', "Shot Weight (g)")):
+            low, high = range_bounds.get(column, (0.0, 0.0))
+            if low >= high:
+                continue
+            selected = st.slider(label, min_value=float(low), max_value=float(high), value=(float(low), float(high)),
+                                 key=f"filter_{column}", on_change=reset_pagination)
+            # Only narrow the query when the range was actually moved from the full extent
+            if selected != (float(low), float(high)):
+                filters[column] = selected
+    return filters
+
+
+# Function to render one page of ranked search results. Only the current page is
+# fetched from the full-text index, so only its images are read.
+def display_search_results(search_query, page_size, filters=None):
+    if st.session_state.get('search_query') != search_query:
+        st.session_state['search_query'] = search_query
+        st.session_state['search_page'] = 0
+    search_page = st.session_state.get('search_page', 0)
+
+    # Ranked lookup through the SQLite full-text index; one extra row tells whether a next page exists
+    df_results = search_products(search_query, limit=page_size + 1, offset=search_page * page_size, filters=filters)
+    if df_results.empty:
+        if search_page > 0:
+            st.session_state['search_page'] = 0
+            st.rerun()
+        display_similar_products(search_query, page_size, filters)
+        return
+    has_next = len(df_results) > page_size
+    df_results = df_results.head(page_size)
+
+    pending_image_ids = get_pending_image_ids()
+    for _, row in df_results.iterrows():
+        display_product_row(row, pending_image_ids)
+
+    navigation = display_page_navigation(f"Results page {search_page + 1}", search_page > 0, has_next, "search")
+    if navigation:
+        st.session_state['search_page'] = search_page + (1 if navigation == "next" else -1)
+        st.rerun()
 
-    if df_filtered.empty:
+
+# Function to render products resembling a query that had no exact matches,
+# e.g. a mould number or ID keyed in with a typo
+def display_similar_products(search_query, page_size, filters=None):
+    df_similar = fuzzy_search_products(search_query, limit=page_size, filters=filters)
+    if df_similar.empty:
         st.warning("No products matching your search query.")
+        return
+    st.info(f"No exact matches for '{search_query}'. Showing similar products:")
+    pending_image_ids = get_pending_image_ids()
+    for _, row in df_similar.iterrows():
+        display_product_row(row, pending_image_ids)
+
+
+# Function to render previous/next buttons around a page label; returns the clicked direction
+def display_page_navigation(label, has_prev, has_next, key_prefix):
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        clicked_prev = st.button("← Previous", key=f"{key_prefix}_prev", disabled=not has_prev, use_container_width=True)
+    with col_info:
+        st.markdown(f"<div style='text-align: center'>{label}</div>", unsafe_allow_html=True)
+    with col_next:
+        clicked_next = st.button("Next →", key=f"{key_prefix}_next", disabled=not has_next, use_container_width=True)
+    if clicked_prev:
+        return "prev"
+    if clicked_next:
+        return "next"
+    return None
+
+
+# Function to render the export controls; exports stream to a temporary file
+# and are only generated when requested, not on every rerun
+def display_export_controls(search_query, filters=None):
+    with st.expander("Export products"):
+        scope = f"products matching '{search_query}'" if search_query else "all products"
+        if filters:
+            scope = f"filtered {scope}"
+        export_format = st.selectbox("Format", options=list(EXPORT_FORMATS), key="export_format",
+                                     format_func=str.upper)
+        if st.button(f"Prepare export of {scope}", key="prepare_export"):
+            with tempfile.TemporaryFile() as export_file:
+                with st.spinner("Exporting..."):
+                    exported = export_products(export_file, export_format, search_query or None, filters=filters)
+                export_file.seek(0)
+                # Streamlit serves download payloads from memory, so the finished file is handed over as bytes
+                st.download_button(
+                    f"Download {exported} products",
+                    data=export_file.read(),
+                    file_name=f"products{EXPORT_FORMATS[export_format]['extension']}",
+                    mime=EXPORT_FORMATS[export_format]['mime'],
+                    key="download_export",
+                    type="primary",
+                )
+
+
+# Function to reset the listing back to the first page
+def reset_pagination():
+    st.session_state['page_cursor_id'] = None
+    st.session_state['page_direction'] = "next"
+    st.session_state['page_number'] = 1
+    st.session_state['search_page'] = 0
+
+
+# Function to render the current page of the product listing
+def display_products_page(total_products, page_size, filters=None):
+    if 'page_number' not in st.session_state:
+        reset_pagination()
+
+    cursor_id = st.session_state['page_cursor_id']
+    direction = st.session_state['page_direction']
+    df_page, has_more = get_products_page(cursor_id, direction, page_size, filters)
+
+    if direction == "prev" and not has_more:
+        # Walked back to the start (rows may have been deleted meanwhile), show the first page in full
+        reset_pagination()
+        cursor_id, direction = None, "next"
+        df_page, has_more = get_products_page(None, "next", page_size, filters)
+
+    if direction == "next":
+        has_prev, has_next = cursor_id is not None, has_more
     else:
-        for index, row in df_filtered.iterrows():
-            st.subheader(f"Product ID: {row['id']}")
-            col1, col2, col3, col4 = st.columns([1, 1, 1, 0.8])
+        has_prev, has_next = has_more, True
 
-            with col1:
-                image_url = row['image_url'] if pd.notna(row['image_url']) and row['image_url'].strip() else None
+    if df_page.empty:
+        if cursor_id is not None:
+            # The page we were on no longer has rows, go back to the start
+            reset_pagination()
+            st.rerun()
+        st.info("No products found. Please add some products using the 'Add New Product' page.")
+        return
+
+    total_pages = max(1, -(-total_products // page_size))
+    page_number = min(st.session_state['page_number'], total_pages)
+    st.caption(f"Page {page_number} of {total_pages} · {total_products} products")
+
+    pending_image_ids = get_pending_image_ids()
+    for _, row in df_page.iterrows():
+        display_product_row(row, pending_image_ids)
+
+    navigation = display_page_navigation(f"Page {page_number} of {total_pages}", has_prev, has_next, "page")
+    if navigation == "prev":
+        st.session_state['page_cursor_id'] = df_page['id'].iloc[0]
+        st.session_state['page_direction'] = "prev"
+        st.session_state['page_number'] = max(1, page_number - 1)
+        st.rerun()
+    elif navigation == "next":
+        st.session_state['page_cursor_id'] = df_page['id'].iloc[-1]
+        st.session_state['page_direction'] = "next"
+        st.session_state['page_number'] = page_number + 1
+        st.rerun()
+
+
+# Function to render a single product with its image, details and actions
+def display_product_row(row, pending_image_ids=frozenset()):
+    st.subheader(f"Product ID: {row['id']}")
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 0.8])
+
+    with col1:
+        image_url = row['image_url'] if isinstance(row['image_url'], str) and row['image_url'].strip() else None
                 
-                if image_url:
-                    # Convert relative path to absolute path for local images
-                    if not image_url.startswith(('http://', 'https://')):
-                        # It's a local file path - validate it's safe
-                        absolute_path = os.path.join(os.path.dirname(__file__), image_url)
-                        absolute_path = os.path.abspath(absolute_path)
-                        images_dir_abs = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/images'))
-                        
-                        # Ensure path is within images directory (security check)
-                        if absolute_path.startswith(images_dir_abs) and os.path.exists(absolute_path):
-                            st.image(absolute_path, caption=f"ID: {row['id']}")
-                        else:
-                            st.image("https://placehold.co/200x200?text=Image+Not+Found", caption=f"ID: {row['id']}")
-                    else:
-                        # It's a URL
-                        st.image(image_url, caption=f"ID: {row['id']}")
+        if image_url:
+            # Local images: the smallest stored rendition that fits, served from the in-process cache
+            if not image_url.startswith(('http://', 'https://')):
+                image_bytes = load_image_bytes(image_url, width=LIST_IMAGE_WIDTH)
+                if image_bytes:
+                    st.image(image_bytes, caption=f"ID: {row['id']}", width=LIST_IMAGE_WIDTH)
                 else:
-                    # Display a placeholder if no image URL
-                    st.image("https://placehold.co/200x200?text=No+Image", caption=f"ID: {row['id']}")
+                    st.image(placeholder_image("Image Not Found"), caption=f"ID: {row['id']}")
+            else:
+                # It's a URL
+                st.image(image_url, caption=f"ID: {row['id']}", width=LIST_IMAGE_WIDTH)
+        else:
+            # Display a locally generated placeholder if no image URL
+            st.image(placeholder_image("No Image"), caption=f"ID: {row['id']}")
+        if row['id'] in pending_image_ids:
+            st.caption("⏳ New image is being processed...")
             
-            with col2:
-                st.write(f"**Mould No.:** {row['mould_no']}")
-                st.write(f"**Location:** {row['location']}")
-                st.write(f"**Hook:** {row['hook']}") 
-                st.write(f"**Description:** {row['description']}")
+    with col2:
+        st.write(f"**Mould No.:** {row['mould_no']}")
+        st.write(f"**Location:** {row['location']}")
+        st.write(f"**Hook:** {row['hook']}") 
+        st.write(f"**Description:** {row['description']}")
             
-            with col3:
-                st.write(f"**Cavities:** {row['cavaties']}")
-                st.write(f"**Part Weight:** {row['part_wt']} g")
-                st.write(f"**Shot Weight:** {row['short_wt']} g")
-
-            with col4:
-                delete_button_key = f"delete_button_{row['id']}"
-                update_button_key = f"update_button_{row['id']}"
+    with col3:
+        st.write(f"**Cavities:** {row['cavaties']}")
+        st.write(f"**Part Weight:** {row['part_wt']} g")
+        st.write(f"**Shot Weight:** {row['short_wt']} g")
+
+    with col4:
+        delete_button_key = f"delete_button_{row['id']}"
+        update_button_key = f"update_button_{row['id']}"
                 
-                # Update button
-                if st.button("Update", key=update_button_key, type="secondary"):
-                    # Set query params and switch page
-                    st.session_state["product_id"] = row['id']
-                    st.switch_page("update_product.py")
+        # Update button
+        if st.button("Update", key=update_button_key, type="secondary"):
+            # Set query params and switch page
+            st.session_state["product_id"] = row['id']
+            st.switch_page("update_product.py")
                 
-                # Delete button
-                if st.button("Delete", key=delete_button_key):
-                    st.session_state['confirm_delete_id'] = row['id']
-                    st.session_state['show_confirm_dialog'] = True
-                    st.rerun()
+        # Delete button
+        if st.button("Delete", key=delete_button_key):
+            st.session_state['confirm_delete_id'] = row['id']
+            st.session_state['show_confirm_dialog'] = True
+            st.rerun()
 
-            st.markdown("---")
+    st.markdown("---")
 
 if __name__ == "__main__":
     display_products()
\ No newline at end of file
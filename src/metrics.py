@@ -0,0 +1,200 @@
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Metrics ---
+# In-process counters and latency histograms for the data and image layers,
+# exported in Prometheus text format. Recording is a perf_counter() pair plus a
+# short locked update, cheap enough to leave on all the time. No Streamlit
+# dependency, so CLIs and the API server can record and serve metrics too.
+METRIC_PREFIX = "product_app"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_HOST = os.environ.get('PRODUCTS_METRICS_HOST', "127.0.0.1")
+METRICS_PORT = int(os.environ.get('PRODUCTS_METRICS_PORT', "9464"))  # 0 disables the endpoint
+
+logger = logging.getLogger(__name__)
+
+
+# Latency histogram (per operation) plus its error count
+class OperationStats:
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.total_seconds = 0.0
+        self.errors = 0
+
+    # Approximate quantile from the buckets (linear within a bucket)
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                upper = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else lower * 2
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return LATENCY_BUCKETS[-1]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}  # operation: OperationStats
+        self._counters = {}  # (name, ((label, value), ...)): value
+        self._gauges = {}  # name: (help, kind, callback returning a number)
+
+    def observe(self, operation, seconds, error=False):
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self._operations.get(operation)
+            if stats is None:
+                stats = self._operations[operation] = OperationStats()
+            stats.bucket_counts[index] += 1
+            stats.count += 1
+            stats.total_seconds += seconds
+            if error:
+                stats.errors += 1
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    # Gauges (or counters kept elsewhere, kind="counter") are read when metrics
+    # are rendered, so they cost nothing in between
+    def register_gauge(self, name, help_text, callback, kind="gauge"):
+        with self._lock:
+            self._gauges[name] = (help_text, kind, callback)
+
+    def count_error(self, operation):
+        with self._lock:
+            stats = self._operations.get(operation)
+            if stats is None:
+                stats = self._operations[operation] = OperationStats()
+            stats.errors += 1
+
+    # Copy of {operation: OperationStats}, {counter key: value} and {gauge: (help, kind, value)}
+    def snapshot(self):
+        with self._lock:
+            operations = {}
+            for name, stats in self._operations.items():
+                copy = OperationStats()
+                copy.bucket_counts = list(stats.bucket_counts)
+                copy.count, copy.total_seconds, copy.errors = stats.count, stats.total_seconds, stats.errors
+                operations[name] = copy
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        gauge_values = {}
+        for name, (help_text, kind, callback) in gauges.items():
+            try:
+                gauge_values[name] = (help_text, kind, float(callback()))
+            except Exception:
+                logger.exception("Metrics gauge %s failed", name)
+        return operations, counters, gauge_values
+
+    def render_prometheus(self):
+        operations, counters, gauge_values = self.snapshot()
+        lines = []
+        duration = f"{METRIC_PREFIX}_operation_duration_seconds"
+        lines += [f"# HELP {duration} Latency of instrumented operations.", f"# TYPE {duration} histogram"]
+        for operation, stats in sorted(operations.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + (float('inf'),), stats.bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f'{duration}_bucket{{operation="{operation}",le="{le}"}} {cumulative}')
+            lines.append(f'{duration}_sum{{operation="{operation}"}} {stats.total_seconds!r}')
+            lines.append(f'{duration}_count{{operation="{operation}"}} {stats.count}')
+        errors = f"{METRIC_PREFIX}_operation_errors_total"
+        lines += [f"# HELP {errors} Failed calls of instrumented operations.", f"# TYPE {errors} counter"]
+        for operation, stats in sorted(operations.items()):
+            lines.append(f'{errors}{{operation="{operation}"}} {stats.errors}')
+        for name in sorted({name for name, _ in counters}):
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    label_text = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+                    lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        for name, (help_text, kind, value) in sorted(gauge_values.items()):
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}", f"{metric} {value!r}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# Decorator recording latency and failures of `operation`. Exceptions count as
+# errors; so do results for which `error_when(result)` is true (for helpers that
+# report failure by returning False/None). Streamlit's rerun/stop signals are
+# BaseExceptions and are timed but not counted as errors.
+def instrument(operation, error_when=None):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            error = False
+            try:
+                result = func(*args, **kwargs)
+                error = error_when is not None and error_when(result)
+                return result
+            except Exception:
+                error = True
+                raise
+            finally:
+                registry.observe(operation, time.perf_counter() - start, error)
+        return wrapper
+    return decorate
+
+
+# Count a failure an instrumented operation handled itself (e.g. reported via st.error)
+def count_error(operation):
+    registry.count_error(operation)
+
+
+def count_cache_lookup(cache, hit):
+    registry.increment("cache_requests", cache=cache, result="hit" if hit else "miss")
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+# Serve /metrics from a daemon thread of this process, once. Returns the bound
+# (host, port), or None when disabled or the port is taken (e.g. by another app process).
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    global _server
+    with _server_lock:
+        if _server is None and port:
+            try:
+                _server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+            except OSError as e:
+                logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+                _server = False
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server.server_address if _server else None
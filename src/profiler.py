@@ -0,0 +1,148 @@
+import cProfile
+import functools
+import glob
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import streamlit as st
+
+# --- Page profiling ---
+# Opt-in capture of one page run: a cProfile CPU profile plus the top allocations
+# recorded by tracemalloc, saved under PROFILES_DIR. Switched on for every session
+# with PRODUCTS_PROFILE=1, or for a single operator's session from the Diagnostics
+# page. When off, a wrapped page costs one flag check per run.
+PROFILING_ENABLED = os.environ.get('PRODUCTS_PROFILE', "") not in ("", "0")
+PROFILES_DIR = os.environ.get('PRODUCTS_PROFILES_DIR', os.path.join(os.path.dirname(__file__), '../data/profiles'))
+PROFILE_SESSION_KEY = "profile_page_runs"
+PROFILE_TOP_N = 30
+PROFILE_MAX_CAPTURES = 50
+TRACEMALLOC_FRAMES = 1
+
+logger = logging.getLogger(__name__)
+
+# cProfile and tracemalloc are process-wide, so only one run is captured at a
+# time; runs starting while another is being captured just run normally
+_capture_lock = threading.Lock()
+
+
+def profiling_requested():
+    return PROFILING_ENABLED or bool(st.session_state.get(PROFILE_SESSION_KEY))
+
+
+# Decorator capturing a profile of each run of a page function while profiling is on.
+# Runs ended by st.rerun()/st.stop()/st.switch_page() are captured too.
+def profile_page(page):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiling_requested() or not _capture_lock.acquire(blocking=False):
+                return func(*args, **kwargs)
+            try:
+                return capture_run(page, func, args, kwargs)
+            finally:
+                _capture_lock.release()
+        return wrapper
+    return decorate
+
+
+def capture_run(page, func, args, kwargs):
+    started = datetime.now()
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    profiler = cProfile.Profile()
+    outcome = "completed"
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        outcome = f"failed: {type(e).__name__}: {e}"
+        raise
+    except BaseException as e:
+        # Streamlit's rerun/stop/switch-page signals
+        outcome = f"ended by {type(e).__name__}"
+        raise
+    finally:
+        profiler.disable()
+        wall_seconds = time.perf_counter() - start
+        after = tracemalloc.take_snapshot()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        if not was_tracing:
+            tracemalloc.stop()
+        try:
+            save_capture(page, started, wall_seconds, outcome, profiler, before, after, peak_bytes)
+        except Exception:
+            logger.exception("Saving the profile of %s failed", page)
+
+
+# Top allocation sites still alive at the end of the run (net of those alive before)
+def top_allocations(before, after, limit=PROFILE_TOP_N):
+    ignored = (tracemalloc.Filter(False, tracemalloc.__file__),
+               tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+               tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+               tracemalloc.Filter(False, "<unknown>"))
+    stats = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), 'lineno')
+    allocations = []
+    for stat in stats:
+        if stat.size_diff <= 0:
+            continue
+        frame = stat.traceback[0]
+        allocations.append({'location': f"{frame.filename}:{frame.lineno}",
+                            'size_bytes': stat.size_diff, 'count': stat.count_diff})
+        if len(allocations) == limit:
+            break
+    return allocations
+
+
+def save_capture(page, started, wall_seconds, outcome, profiler, before, after, peak_bytes):
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    base = os.path.join(PROFILES_DIR, f"{started.strftime('%Y%m%d-%H%M%S-%f')}-{page}")
+    profiler.dump_stats(base + ".prof")
+    cpu_report = io.StringIO()
+    pstats.Stats(profiler, stream=cpu_report).sort_stats('cumulative').print_stats(PROFILE_TOP_N)
+    report = {
+        'page': page,
+        'started': started.isoformat(timespec='seconds'),
+        'wall_seconds': wall_seconds,
+        'outcome': outcome,
+        'peak_traced_bytes': peak_bytes,
+        'cpu_report': cpu_report.getvalue(),
+        'allocations': top_allocations(before, after),
+    }
+    with open(base + ".json", 'w') as f:
+        json.dump(report, f, indent=2)
+    prune_captures()
+
+
+def prune_captures(keep=PROFILE_MAX_CAPTURES):
+    reports = sorted(glob.glob(os.path.join(PROFILES_DIR, "*.json")))
+    for report_path in reports[:-keep]:
+        for path in (report_path, report_path[:-len(".json")] + ".prof"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# Most recent captures first, each report dict with its 'profile_path' added
+def list_captures(limit=20):
+    captures = []
+    for report_path in sorted(glob.glob(os.path.join(PROFILES_DIR, "*.json")), reverse=True)[:limit]:
+        try:
+            with open(report_path) as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        report['profile_path'] = report_path[:-len(".json")] + ".prof"
+        captures.append(report)
+    return captures
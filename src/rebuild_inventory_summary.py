@@ -0,0 +1,27 @@
+import argparse
+import sys
+
+from utils import check_inventory_summary, rebuild_inventory_summary
+
+
+# Recompute the inventory summary tables from the products table, reporting any
+# rows the triggers had let drift:
+#   python src/rebuild_inventory_summary.py [--check]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute the inventory statistics summary from scratch.")
+    parser.add_argument("--check", action="store_true",
+                        help="Only compare the summary with the products table; exit with status 1 on differences")
+    args = parser.parse_args(argv)
+
+    mismatches = check_inventory_summary() if args.check else rebuild_inventory_summary()
+    for dimension, value, column, stored, expected in mismatches:
+        print(f"{dimension}={value!r} {column}: stored {stored}, expected {expected}")
+    if args.check:
+        print(f"{len(mismatches)} differences found.", file=sys.stderr)
+        return 1 if mismatches else 0
+    print(f"Summary rebuilt, {len(mismatches)} differences corrected.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,8 @@
 import streamlit as st
+from metrics import start_metrics_server
+
+# Prometheus endpoint for this server process (started once, see metrics.py)
+start_metrics_server()
 
 # Setup navigation pages in this file
 pages = [
@@ -16,6 +20,26 @@ pages = [
         "update_product.py",
         title="Update Product",
         icon=":material/edit:",
+    ),
+    st.Page(
+        "bulk_import.py",
+        title="Bulk Import",
+        icon=":material/upload_file:",
+    ),
+    st.Page(
+        "bulk_edit.py",
+        title="Bulk Edit",
+        icon=":material/table_edit:",
+    ),
+    st.Page(
+        "inventory_stats.py",
+        title="Statistics",
+        icon=":material/bar_chart:",
+    ),
+    st.Page(
+        "diagnostics.py",
+        title="Diagnostics",
+        icon=":material/monitoring:",
     )
 ]
 
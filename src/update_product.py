@@ -1,10 +1,11 @@
 import time
 import streamlit as st
-import os
-from utils import get_product_by_id, update_product_in_db, upload_image_to_local
+from profiler import profile_page
+from utils import HOOK_OPTIONS, get_product_by_id, load_image_bytes, update_product_in_db, upload_image_in_background
 
 st.set_page_config(page_title="Update Product", page_icon="📦", layout="centered")
 
+@profile_page("update_product_page")
 def update_product_page():
     st.title("Update Product")
 
@@ -34,7 +35,7 @@ def update_product_page():
         location = st.text_input("Location", value=existing_product.get('location', ''), help="Rack").strip()
         
         # Handle hook selection with safe indexing
-        hook_options = ["Plastic", "Metal"]
+        hook_options = HOOK_OPTIONS
         current_hook = existing_product.get('hook', 'Plastic')
         hook_index = 0 if current_hook == "Plastic" else (1 if current_hook == "Metal" else 0)
         hook = st.selectbox("Hook", options=hook_options, index=hook_index).strip()
@@ -49,16 +50,11 @@ def update_product_page():
         current_image_url = existing_product.get('image_url', '')
         if current_image_url:
             st.subheader("Current Image")
-            # Convert relative path to absolute path for local images
+            # Local images: show the smallest stored rendition that fits
             if not current_image_url.startswith(('http://', 'https://')):
-                # It's a local file path - validate it's safe
-                absolute_path = os.path.join(os.path.dirname(__file__), current_image_url)
-                absolute_path = os.path.abspath(absolute_path)
-                images_dir_abs = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/images'))
-                
-                # Ensure path is within images directory (security check)
-                if absolute_path.startswith(images_dir_abs) and os.path.exists(absolute_path):
-                    st.image(absolute_path, caption="Current Product Image", width=200)
+                image_bytes = load_image_bytes(current_image_url, width=200)
+                if image_bytes:
+                    st.image(image_bytes, caption="Current Product Image", width=200)
                 else:
                     st.warning("Current image file not found.")
             else:
@@ -72,29 +68,24 @@ def update_product_page():
         submitted = st.form_submit_button("Update Product", type="primary")
 
         if submitted:
-            image_url_to_save = current_image_url  # Keep current image by default
-
-            # If a new image is uploaded, upload it and update the URL
-            if uploaded_image is not None:
-                uploaded_url = upload_image_to_local(uploaded_image, product_id)
-                if uploaded_url:
-                    image_url_to_save = uploaded_url
-                else:
-                    st.warning("Failed to upload new image. Keeping the current image.")
-            
             updated_product_data = {
                 'mould_no': mould_no,
                 'description': description,
-                'image_url': image_url_to_save,
                 'location': location,
                 'hook': hook,
                 'cavaties': int(cavaties),
                 'part_wt': round(float(part_wt), 2),
                 'short_wt': round(float(short_wt), 2)
-            }
+            }  # image_url is left as is; a new upload replaces it once processed
             
             if update_product_in_db(product_id, updated_product_data):
                 st.success(f"Product '{product_id}' updated successfully!")
+                # If a new image is uploaded, process it in the background and swap it in when ready
+                if uploaded_image is not None:
+                    if upload_image_in_background(uploaded_image, product_id):
+                        st.info("The new image is being processed and will appear shortly.")
+                    else:
+                        st.warning("Failed to upload new image. Keeping the current image.")
                 # Clear the id query param when going back
                 st.session_state["product_id"] = None
                 st.balloons()
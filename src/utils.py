@@ -1,33 +1,276 @@
 
 import streamlit as st
-import pandas as pd
 import uuid
 import sqlite3
-from PIL import Image
 import io
 import os
+import re
+import atexit
+import queue
+import threading
+import functools
+import time
+import logging
+import math
+from concurrent.futures import Future
+from contextlib import contextmanager
+from image_store import (RENDITION_FILENAME_RE, ImageBytesCache, image_digest, image_file_paths,
+                         pick_rendition, pick_stored_rendition, store_image, stored_image_path)
+from catalog_snapshot import prune_snapshots, read_snapshot, snapshot_path, write_snapshot
+from image_worker import image_worker
+from metrics import count_cache_lookup, count_error, instrument, registry as metrics_registry
+
+# pandas and Pillow are imported inside the functions that use them, so pages and
+# tools that never build a DataFrame or decode an image don't pay for importing them.
 
 # --- SQLite Configuration ---
-DB_PATH = os.path.join(os.path.dirname(__file__), '../data/products.db')
-IMAGES_DIR = os.path.join(os.path.dirname(__file__), '../data/images')
-os.makedirs(IMAGES_DIR, exist_ok=True)
+# Both locations can be overridden (e.g. to point benchmarks at a scratch directory)
+DB_PATH = os.environ.get('PRODUCTS_DB_PATH', os.path.join(os.path.dirname(__file__), '../data/products.db'))
+IMAGES_DIR = os.environ.get('PRODUCTS_IMAGES_DIR', os.path.join(os.path.dirname(__file__), '../data/images'))
+
+# Per-connection tuning: WAL lets readers run alongside a writer, NORMAL sync is
+# safe under WAL, and a larger page cache / mmap window keeps hot pages in memory.
+SQLITE_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",  # ~16 MB
+    "PRAGMA mmap_size = 268435456",  # 256 MB
+    "PRAGMA temp_store = MEMORY",
+)
+POOL_MAX_IDLE = 8
+
+logger = logging.getLogger(__name__)
 
+
+# Open a new, fully configured SQLite connection (normally borrowed via db_connection())
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=10.0)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=10.0, cached_statements=256)
     conn.row_factory = sqlite3.Row
-    # Enable foreign key constraints for data integrity
-    conn.execute("PRAGMA foreign_keys = ON")
-    # Set secure file permissions on database file
-    try:
-        os.chmod(DB_PATH, 0o600)  # Owner read/write only
-    except (OSError, FileNotFoundError):
-        pass  # File might not exist yet
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
-# --- Initialize DB if not exists ---
-def init_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+
+# Thread-safe pool of open connections shared by every Streamlit session and rerun.
+# Connections (and their prepared statement caches) are reused instead of being
+# reopened and re-configured for every query.
+class ConnectionPool:
+    def __init__(self, max_idle=POOL_MAX_IDLE):
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._permissions_set = False
+
+    def acquire(self):
+        if self._closed:
+            raise RuntimeError("Connection pool is closed.")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            conn = get_db_connection()
+            with self._lock:
+                if not self._permissions_set:
+                    # Set secure file permissions on database file once it exists
+                    try:
+                        os.chmod(DB_PATH, 0o600)  # Owner read/write only
+                    except OSError:
+                        pass
+                    self._permissions_set = True
+            return conn
+
+    def release(self, conn):
+        discard = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection must not go back into the pool
+            discard = True
+        with self._lock:
+            keep = not discard and not self._closed and self._idle.qsize() < self.max_idle
+            if keep:
+                self._idle.put(conn)
+        if not keep:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+
+
+db_pool = ConnectionPool()
+
+
+# Borrow a pooled connection: `with db_connection() as conn: ...`
+# Uncommitted work is rolled back when the connection is returned.
+def db_connection():
+    ensure_db()
+    return db_pool.connection()
+
+
+# Close all pooled connections (also runs automatically at interpreter exit)
+def close_db_pool():
+    db_pool.close()
+
+atexit.register(close_db_pool)
+
+
+# --- Single writer ---
+# All writes go through one background thread that owns the only write connection.
+# Sessions queue operations and wait on a future; the writer drains whatever is
+# queued into one transaction (group commit), running each operation of a larger
+# batch in its own savepoint so a failing operation is rolled back and reported on its own.
+WRITER_MAX_BATCH = 64
+WRITER_MAX_QUEUED = 1024
+WRITER_TIMEOUT = 30.0
+
+
+class DatabaseWriter:
+    def __init__(self, max_batch=WRITER_MAX_BATCH, max_queued=WRITER_MAX_QUEUED):
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.batches = 0
+        self.operations = 0
+        self.after_batch = None  # called on the writer thread after each committed batch
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Database writer is closed.")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    # Queue `operation(conn)` and return a Future for its result. After the batch
+    # commits, `on_commit(result)` runs on the writer thread, in commit order.
+    def submit(self, operation, on_commit=None):
+        ensure_db()
+        self._ensure_started()
+        future = Future()
+        self._queue.put((operation, on_commit, future), timeout=WRITER_TIMEOUT)
+        return future
+
+    def _run(self):
+        conn = get_db_connection()
+        # Transactions are managed explicitly (BEGIN / SAVEPOINT / COMMIT)
+        conn.isolation_level = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                stop = False
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._write_batch(conn, [entry for entry in batch if entry[2].set_running_or_notify_cancel()])
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        if not batch:
+            return
+        outcomes = []
+        # A lone operation needs no savepoint: the transaction is rolled back instead.
+        # Large writes (imports) run alone, and with temp_store = MEMORY the savepoint
+        # journal makes their page writes slower the more pages they touch.
+        single = len(batch) == 1
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for operation, _, _ in batch:
+                if not single:
+                    conn.execute("SAVEPOINT operation")
+                try:
+                    outcomes.append((operation(conn), None))
+                    if not single:
+                        conn.execute("RELEASE operation")
+                except Exception as e:
+                    if single:
+                        raise
+                    conn.execute("ROLLBACK TO operation")
+                    conn.execute("RELEASE operation")
+                    outcomes.append((None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # The whole transaction failed (e.g. locked by another process, or its only
+            # operation raised): fail every operation
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.operations += len(batch)
+        for (_, on_commit, future), (result, error) in zip(batch, outcomes):
+            if error is not None:
+                future.set_exception(error)
+                continue
+            if on_commit is not None:
+                try:
+                    on_commit(result)
+                except Exception:
+                    logger.exception("Database writer commit callback failed")
+            future.set_result(result)
+        if self.after_batch is not None:
+            try:
+                self.after_batch()
+            except Exception:
+                logger.exception("Database writer batch callback failed")
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=WRITER_TIMEOUT)
+
+
+db_writer = DatabaseWriter()
+
+
+# Run a write operation through the single writer and wait for it to commit.
+# Returns the operation's result; raises whatever the operation (or the commit) raised.
+def run_write(operation, on_commit=None):
+    return db_writer.submit(operation, on_commit).result(timeout=WRITER_TIMEOUT)
+
+
+def close_db_writer():
+    db_writer.close()
+
+atexit.register(close_db_writer)
+
+
+# --- Schema ---
+def init_products_table(cursor):
     cursor.execute('''CREATE TABLE IF NOT EXISTS products (
         id TEXT PRIMARY KEY,
         mould_no TEXT,
@@ -39,36 +282,1031 @@ def init_db():
         part_wt REAL,
         short_wt REAL
     )''')
-    conn.commit()
-    conn.close()
-init_db()
 
 
+# --- Full-text search index (FTS5) ---
+# External-content FTS5 table over the searchable columns of `products`.
+# Triggers keep it in sync with every INSERT/UPDATE/DELETE, so the write
+# helpers below don't need to know about it.
+def init_search_index(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='products_fts'")
+    index_exists = cursor.fetchone() is not None
+    cursor.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        id, mould_no, description, location,
+        content='products', content_rowid='rowid'
+    )''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, id, mould_no, description, location)
+        VALUES (new.rowid, new.id, new.mould_no, new.description, new.location);
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, id, mould_no, description, location)
+        VALUES ('delete', old.rowid, old.id, old.mould_no, old.description, old.location);
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, id, mould_no, description, location)
+        VALUES ('delete', old.rowid, old.id, old.mould_no, old.description, old.location);
+        INSERT INTO products_fts(rowid, id, mould_no, description, location)
+        VALUES (new.rowid, new.id, new.mould_no, new.description, new.location);
+    END''')
+    if not index_exists:
+        # Index rows that were already in the database before FTS was added
+        cursor.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+# --- Trigram index (fuzzy search) ---
+# FTS5 trigram index over the short identifier columns, used to find candidates
+# for typo-tolerant lookups (see fuzzy_search_products). Kept in sync by triggers
+# like products_fts.
+def init_trigram_index(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='products_trigram'")
+    index_exists = cursor.fetchone() is not None
+    cursor.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS products_trigram USING fts5(
+        id, mould_no, location,
+        content='products', content_rowid='rowid', tokenize='trigram', detail='none'
+    )''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS products_trigram_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_trigram(rowid, id, mould_no, location)
+        VALUES (new.rowid, new.id, new.mould_no, new.location);
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS products_trigram_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_trigram(products_trigram, rowid, id, mould_no, location)
+        VALUES ('delete', old.rowid, old.id, old.mould_no, old.location);
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS products_trigram_au AFTER UPDATE OF id, mould_no, location ON products BEGIN
+        INSERT INTO products_trigram(products_trigram, rowid, id, mould_no, location)
+        VALUES ('delete', old.rowid, old.id, old.mould_no, old.location);
+        INSERT INTO products_trigram(rowid, id, mould_no, location)
+        VALUES (new.rowid, new.id, new.mould_no, new.location);
+    END''')
+    if not index_exists:
+        cursor.execute("INSERT INTO products_trigram(products_trigram) VALUES ('rebuild')")
+
+
+# --- Fuzzy keys (typo-tolerant lookup of short codes) ---
+# Short IDs and mould numbers have too few trigrams for one typo to leave a match,
+# so products_fuzzy_keys stores, for each such value (lowercased), the value
+# itself and every variant with one character deleted. The deletions of a query
+# then meet those of every value within one substitution, insertion, deletion
+# or swap of adjacent characters. Kept in sync by triggers.
+FUZZY_KEY_COLUMNS = ['id', 'mould_no']
+FUZZY_KEY_MAX_LENGTH = 8
+# Positions 0 (the value itself) to FUZZY_KEY_MAX_LENGTH; triggers can't use a recursive CTE
+FUZZY_KEY_POSITIONS = " UNION ALL ".join(["SELECT 0 AS n"] + [f"SELECT {n}" for n in range(1, FUZZY_KEY_MAX_LENGTH + 1)])
+
+
+# SELECT of the (key, product) rows of one product (row='new' in a trigger) or,
+# without row, of all products
+def fuzzy_keys_select(row=None):
+    source = f"{row}." if row else ""
+    table = "" if row else " FROM products"
+    values = " UNION ".join(f"SELECT lower({source}{column}) AS v, {source}rowid AS product{table}" for column in FUZZY_KEY_COLUMNS)
+    return f"""SELECT substr(v, 1, n - 1) || substr(v, n + 1), product
+        FROM ({values}), ({FUZZY_KEY_POSITIONS})
+        WHERE length(v) BETWEEN 1 AND {FUZZY_KEY_MAX_LENGTH} AND n <= length(v) AND length(v) - (n > 0) > 0"""
+
+
+def init_fuzzy_keys(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS products_fuzzy_keys (
+        key TEXT NOT NULL,
+        product INTEGER NOT NULL,
+        PRIMARY KEY (key, product)
+    ) WITHOUT ROWID''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_fuzzy_keys_product ON products_fuzzy_keys (product)")
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_fuzzy_keys_ai AFTER INSERT ON products BEGIN
+        INSERT OR IGNORE INTO products_fuzzy_keys (key, product) {fuzzy_keys_select('new')};
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS products_fuzzy_keys_ad AFTER DELETE ON products BEGIN
+        DELETE FROM products_fuzzy_keys WHERE product = old.rowid;
+    END''')
+    changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in FUZZY_KEY_COLUMNS)
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_fuzzy_keys_au AFTER UPDATE OF {', '.join(FUZZY_KEY_COLUMNS)} ON products
+    WHEN {changed} BEGIN
+        DELETE FROM products_fuzzy_keys WHERE product = old.rowid;
+        INSERT OR IGNORE INTO products_fuzzy_keys (key, product) {fuzzy_keys_select('new')};
+    END''')
+    cursor.execute(f"INSERT OR IGNORE INTO products_fuzzy_keys (key, product) {fuzzy_keys_select()}")
+
+
+# --- Data version ---
+# A counter in the `meta` table that every change to `products` bumps (via
+# triggers, one step per affected row). Caches are keyed on it, so a reader
+# only reloads when the version it holds is stale, in any server process.
+def init_data_version(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )''')
+    cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_version_{event.lower()} AFTER {event} ON products BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+        END''')
+
+
+def read_data_version(conn):
+    return conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()[0]
+
+
+# Function to get the current data version from SQLite
+def get_data_version():
+    with db_connection() as conn:
+        return read_data_version(conn)
+
+
+# Random id telling this database apart from one recreated at the same path,
+# whose data versions start over
+def init_database_id(cursor):
+    cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('database_id', abs(random() % 1000000000000))")
+
+
+_database_id = None
+
+
+def get_database_id():
+    global _database_id
+    if _database_id is None:
+        with db_connection() as conn:
+            _database_id = conn.execute("SELECT value FROM meta WHERE key = 'database_id'").fetchone()[0]
+    return _database_id
+
+
+# --- Facet indexes and counts ---
+# Indexes answer the Product List facet filters and weight ranges; facet_counts
+# holds the number of products per location / hook / cavities value and is kept
+# current by triggers, so facet counts never need a GROUP BY over the catalog.
+def init_facets(cursor):
+    for column in ('location', 'hook', 'cavaties', 'part_wt', 'short_wt'):
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_products_{column} ON products ({column})")
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='facet_counts'")
+    counts_exist = cursor.fetchone() is not None
+    cursor.execute('''CREATE TABLE IF NOT EXISTS facet_counts (
+        facet TEXT NOT NULL,
+        value,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (facet, value)
+    )''')
+    # Products without a value aren't counted; rows that drop to zero are removed
+    add = ("INSERT INTO facet_counts (facet, value, count) SELECT '{0}', new.{0}, 1 WHERE new.{0} IS NOT NULL "
+           "ON CONFLICT (facet, value) DO UPDATE SET count = count + 1;")
+    remove = ("UPDATE facet_counts SET count = count - 1 WHERE facet = '{0}' AND value = old.{0}; "
+              "DELETE FROM facet_counts WHERE facet = '{0}' AND value = old.{0} AND count <= 0;")
+    for column in ('location', 'hook', 'cavaties'):
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_facet_{column}_ai AFTER INSERT ON products BEGIN
+            {add.format(column)}
+        END''')
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_facet_{column}_ad AFTER DELETE ON products BEGIN
+            {remove.format(column)}
+        END''')
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_facet_{column}_au AFTER UPDATE OF {column} ON products
+        WHEN old.{column} IS NOT new.{column} BEGIN
+            {remove.format(column)}
+            {add.format(column)}
+        END''')
+    if not counts_exist:
+        # Count rows that were already in the database before facets were added
+        for column in ('location', 'hook', 'cavaties'):
+            cursor.execute(f"INSERT INTO facet_counts (facet, value, count) SELECT '{column}', {column}, COUNT(*) FROM products WHERE {column} IS NOT NULL GROUP BY {column}")
+
+
+# --- Inventory summary ---
+# inventory_summary holds, per rack location and per hook type (plus one 'all' row
+# for the whole catalog), the product count, total cavities and the sums and counts
+# behind the average part and shot weights. Triggers keep it current on every
+# product write, so statistics read a few hundred rows whatever the catalog size.
+# Products without a location or hook are summarized under ''.
+SUMMARY_DIMENSIONS = {'location': "coalesce({0}.location, '')", 'hook': "coalesce({0}.hook, '')", 'all': "''"}
+SUMMARY_COLUMNS = ['product_count', 'total_cavities', 'part_wt_sum', 'part_wt_count', 'short_wt_sum', 'short_wt_count']
+
+
+def init_inventory_summary(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS inventory_summary (
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        product_count INTEGER NOT NULL,
+        total_cavities INTEGER NOT NULL,
+        part_wt_sum REAL NOT NULL,
+        part_wt_count INTEGER NOT NULL,
+        short_wt_sum REAL NOT NULL,
+        short_wt_count INTEGER NOT NULL,
+        PRIMARY KEY (dimension, value)
+    )''')
+    add = ("INSERT INTO inventory_summary (dimension, value, product_count, total_cavities, part_wt_sum, part_wt_count, "
+           "short_wt_sum, short_wt_count) VALUES ('{0}', {1}, 1, coalesce(new.cavaties, 0), coalesce(new.part_wt, 0), "
+           "new.part_wt IS NOT NULL, coalesce(new.short_wt, 0), new.short_wt IS NOT NULL) "
+           "ON CONFLICT (dimension, value) DO UPDATE SET product_count = product_count + 1, "
+           "total_cavities = total_cavities + excluded.total_cavities, part_wt_sum = part_wt_sum + excluded.part_wt_sum, "
+           "part_wt_count = part_wt_count + excluded.part_wt_count, short_wt_sum = short_wt_sum + excluded.short_wt_sum, "
+           "short_wt_count = short_wt_count + excluded.short_wt_count;")
+    # Rows that drop to zero products are removed
+    remove = ("UPDATE inventory_summary SET product_count = product_count - 1, "
+              "total_cavities = total_cavities - coalesce(old.cavaties, 0), part_wt_sum = part_wt_sum - coalesce(old.part_wt, 0), "
+              "part_wt_count = part_wt_count - (old.part_wt IS NOT NULL), short_wt_sum = short_wt_sum - coalesce(old.short_wt, 0), "
+              "short_wt_count = short_wt_count - (old.short_wt IS NOT NULL) WHERE dimension = '{0}' AND value = {1}; "
+              "DELETE FROM inventory_summary WHERE dimension = '{0}' AND value = {1} AND product_count <= 0;")
+    adds = "\n".join(add.format(dimension, value.format('new')) for dimension, value in SUMMARY_DIMENSIONS.items())
+    removes = "\n".join(remove.format(dimension, value.format('old')) for dimension, value in SUMMARY_DIMENSIONS.items())
+    columns = ('location', 'hook', 'cavaties', 'part_wt', 'short_wt')
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_summary_ai AFTER INSERT ON products BEGIN
+        {adds}
+    END''')
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_summary_ad AFTER DELETE ON products BEGIN
+        {removes}
+    END''')
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_summary_au AFTER UPDATE OF {", ".join(columns)} ON products
+    WHEN {" OR ".join(f"old.{column} IS NOT new.{column}" for column in columns)} BEGIN
+        {removes}
+        {adds}
+    END''')
+    cursor.execute("DELETE FROM inventory_summary")
+    fill_inventory_summary(cursor)
+
+
+# Summary rows recomputed from the products table: {(dimension, value): {column: value}}
+def compute_inventory_summary(conn):
+    summary = {}
+    for dimension, value in SUMMARY_DIMENSIONS.items():
+        rows = conn.execute(f'''SELECT {value.format('products')}, COUNT(*), TOTAL(cavaties), TOTAL(part_wt), COUNT(part_wt),
+            TOTAL(short_wt), COUNT(short_wt) FROM products GROUP BY 1''').fetchall()
+        for row in rows:
+            summary[(dimension, row[0])] = dict(zip(SUMMARY_COLUMNS, tuple(row)[1:]))
+    return summary
+
+
+def fill_inventory_summary(conn):
+    conn.executemany(f"INSERT INTO inventory_summary (dimension, value, {', '.join(SUMMARY_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     [(dimension, value, *(row[column] for column in SUMMARY_COLUMNS))
+                      for (dimension, value), row in compute_inventory_summary(conn).items()])
+
+
+# Differences between the stored summary and one recomputed from scratch, as
+# (dimension, value, column, stored, expected); weight sums allow for rounding drift
+def compare_inventory_summary(conn):
+    stored = {(row['dimension'], row['value']): {column: row[column] for column in SUMMARY_COLUMNS}
+              for row in conn.execute("SELECT * FROM inventory_summary").fetchall()}
+    expected = compute_inventory_summary(conn)
+    mismatches = []
+    for key in sorted(stored.keys() | expected.keys()):
+        stored_row, expected_row = stored.get(key, {}), expected.get(key, {})
+        for column in SUMMARY_COLUMNS:
+            stored_value, expected_value = stored_row.get(column), expected_row.get(column)
+            if stored_value is None or expected_value is None:
+                matches = stored_value == expected_value
+            else:
+                matches = abs(stored_value - expected_value) <= 1e-6 * max(1.0, abs(expected_value))
+            if not matches:
+                mismatches.append((*key, column, stored_value, expected_value))
+    return mismatches
+
+
+# Check the stored summary against the products table without changing anything
+def check_inventory_summary():
+    with db_connection() as conn:
+        conn.execute("BEGIN")  # compare against one consistent snapshot
+        return compare_inventory_summary(conn)
+
+
+# Recompute the summary from scratch; returns the differences found beforehand
+def rebuild_inventory_summary():
+    def rebuild(conn):
+        mismatches = compare_inventory_summary(conn)
+        conn.execute("DELETE FROM inventory_summary")
+        fill_inventory_summary(conn)
+        return mismatches
+    return run_write(rebuild)
+
+
+# --- Image reference index ---
+# image_refs counts the products referencing each stored image (by image_url) and
+# records when an image lost its last reference. Triggers keep it current on every
+# product write, so the orphan sweeper only reads this table instead of scanning
+# the images directory. Images stored by uploads are registered with no references
+# so ones that never get attached are collected too.
+SQL_NOW = "((julianday('now') - 2440587.5) * 86400.0)"  # Unix time, works on any SQLite version
+
+
+def init_image_refs(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='image_refs'")
+    refs_exist = cursor.fetchone() is not None
+    cursor.execute('''CREATE TABLE IF NOT EXISTS image_refs (
+        image_url TEXT PRIMARY KEY,
+        ref_count INTEGER NOT NULL,
+        unreferenced_since REAL
+    )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_image_refs_unreferenced ON image_refs (unreferenced_since) WHERE ref_count <= 0")
+    # Empty values and remote URLs don't refer to local files
+    local = "{0}.image_url <> '' AND {0}.image_url NOT LIKE 'http://%' AND {0}.image_url NOT LIKE 'https://%'"
+    add = (f"INSERT INTO image_refs (image_url, ref_count) SELECT new.image_url, 1 WHERE {local.format('new')} "
+           "ON CONFLICT (image_url) DO UPDATE SET ref_count = ref_count + 1, unreferenced_since = NULL;")
+    remove = (f"UPDATE image_refs SET ref_count = ref_count - 1, "
+              f"unreferenced_since = CASE WHEN ref_count <= 1 THEN {SQL_NOW} END WHERE image_url = old.image_url;")
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_image_refs_ai AFTER INSERT ON products BEGIN
+        {add}
+    END''')
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_image_refs_ad AFTER DELETE ON products BEGIN
+        {remove}
+    END''')
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS products_image_refs_au AFTER UPDATE OF image_url ON products
+    WHEN old.image_url IS NOT new.image_url BEGIN
+        {remove}
+        {add}
+    END''')
+    if not refs_exist:
+        # Index the images products already reference; unreferenced files from
+        # before the index existed are picked up by `image_gc.py --scan`
+        cursor.execute(f"""INSERT INTO image_refs (image_url, ref_count)
+            SELECT image_url, COUNT(*) FROM products WHERE {local.format('products')} GROUP BY image_url""")
+
+
+# Record a newly stored image (inside a write operation); it stays unreferenced until a product uses it
+def register_image(conn, image_url):
+    conn.execute(f"INSERT INTO image_refs (image_url, ref_count, unreferenced_since) VALUES (?, 0, {SQL_NOW}) "
+                 "ON CONFLICT (image_url) DO NOTHING", (image_url,))
+
+
+# --- Pending images ---
+# Pending uploads are tracked in `pending_images` so every session (and server
+# process) can show that a product's image is still being processed.
+def init_pending_images(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS pending_images (
+        product_id TEXT PRIMARY KEY,
+        job_id TEXT NOT NULL,
+        submitted_at REAL NOT NULL
+    )''')
+
+
+# --- Schema migrations ---
+# MIGRATIONS[n] upgrades the schema from version n to n + 1; the current version
+# is stored in PRAGMA user_version, so an up-to-date database costs one PRAGMA
+# read per process. Append new migrations, never edit or reorder existing ones.
+# The first seven create their objects with IF NOT EXISTS so databases from
+# before versioning (user_version 0) are adopted without changes.
+MIGRATIONS = [
+    init_products_table,
+    init_search_index,
+    init_trigram_index,
+    init_data_version,
+    init_pending_images,
+    init_facets,
+    init_image_refs,
+    init_database_id,
+    init_inventory_summary,
+    init_fuzzy_keys,
+]
+
+
+# Bring the database schema up to date. Returns the schema version.
+def init_db():
+    with db_pool.connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= len(MIGRATIONS):
+            return version
+        conn.execute("BEGIN IMMEDIATE")
+        # Another process may have migrated while we waited for the lock
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        cursor = conn.cursor()
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+        return max(version, len(MIGRATIONS))
+
+
+_db_ready = False
+_db_init_lock = threading.Lock()
+
+
+# Create the storage directories and migrate the database, once per process,
+# on first use rather than at import time
+def ensure_db():
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_init_lock:
+        if not _db_ready:
+            os.makedirs(IMAGES_DIR, exist_ok=True)
+            init_db()
+            _db_ready = True
+
+
+
+PRODUCT_COLUMNS = ['id', 'mould_no', 'description', 'image_url', 'location', 'hook', 'cavaties', 'part_wt', 'short_wt']
+
+# Column types of the cached catalog: categoricals for the few distinct racks and
+# hook types, Arrow-backed strings for free text, and a narrow integer for cavities.
+# Weights stay float64 so they read back exactly as stored (float32 turns 1.8 into
+# 1.7999999523...). Takes roughly a third of the memory of object columns holding one
+# Python object per cell.
+CATALOG_DTYPES = {
+    'id': 'string[pyarrow]',
+    'mould_no': 'string[pyarrow]',
+    'description': 'string[pyarrow]',
+    'image_url': 'string[pyarrow]',
+    'location': 'category',
+    'hook': 'category',
+    'cavaties': 'Int16',
+    'part_wt': 'float64',
+    'short_wt': 'float64',
+}
+
+
+# Convert a catalog DataFrame to CATALOG_DTYPES. A column whose stored values don't
+# fit its type (text in a number column, out of range values) keeps its loaded type.
+def compact_catalog(df):
+    import pandas as pd
+    columns = {}
+    for col, dtype in CATALOG_DTYPES.items():
+        series = df[col]
+        try:
+            if dtype in ('Int16', 'float64'):
+                converted = pd.to_numeric(series, errors='coerce')
+                if (converted.isna() & series.notna()).any():
+                    raise ValueError(f"non-numeric values in {col}")
+                series = converted.astype(dtype)
+            else:
+                series = series.astype(dtype)
+        except (TypeError, ValueError, OverflowError):
+            pass
+        columns[col] = series
+    return pd.DataFrame(columns)
+
+
+# Process-wide copy of the full catalog tagged with the data version it was read at.
+# Writes made by this process patch the single changed row (when the cache is at the
+# version just before the write) into a copy that then replaces the cached frame, so
+# frames already handed out never change; anything else just marks it stale for the next read,
+# which maps the published snapshot of the new version if there is one (see
+# catalog_snapshot) and otherwise queries SQLite.
+class CatalogCache:
+    def __init__(self):
+        self.df = None
+        self.version = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        import pandas as pd
+        current_version = get_data_version()
+        with self._lock:
+            if self.df is not None and self.version == current_version:
+                count_cache_lookup("catalog", hit=True)
+                return self.df
+        count_cache_lookup("catalog", hit=False)
+        version, df = current_version, catalog_snapshots.load(current_version)
+        from_sqlite = df is None
+        if from_sqlite:
+            with db_connection() as conn:
+                # Read the version and the rows in one snapshot so they always agree
+                conn.execute("BEGIN")
+                version = read_data_version(conn)
+                df = pd.read_sql_query("SELECT * FROM products", conn)
+                conn.commit()
+            for col in PRODUCT_COLUMNS:
+                if col not in df.columns:
+                    df[col] = ''
+            df = compact_catalog(df[PRODUCT_COLUMNS])
+        with self._lock:
+            if self.version is None or version >= self.version:
+                self.df, self.version = df, version
+        if from_sqlite:
+            # Let the other processes map this version instead of querying it too
+            catalog_snapshots.request()
+        return df
+
+    # Apply a committed single-row change. `version` is the data version right after it.
+    def apply(self, version, op, product_id, product_data=None):
+        import pandas as pd
+        with self._lock:
+            if self.df is None or self.version != version - 1:
+                return  # Stale or empty, the next get() reloads
+            # Patch a copy: readers may hold the cached frame, and one mapped from a
+            # snapshot is read-only (copying is cheap, the Arrow text isn't duplicated)
+            df = self.df.copy()
+            try:
+                if op == "delete":
+                    df = df.drop(index=df.index[df['id'] == product_id]).reset_index(drop=True)
+                else:
+                    df, new_row = self._typed_row(df, product_data)
+                    if op == "insert":
+                        df = pd.concat([df, new_row], ignore_index=True)
+                    elif op == "update":
+                        matches = df.index[df['id'] == product_id]
+                        for col in PRODUCT_COLUMNS:
+                            if col != 'id':
+                                df.loc[matches, col] = new_row[col].iloc[0]
+            except (TypeError, ValueError, OverflowError):
+                self.df, self.version = None, None  # Doesn't fit the cached types, the next get() reloads
+                return
+            self.df, self.version = df, version
+
+    # Apply committed partial updates of existing rows, {product_id: {column: value}},
+    # made in one write. `version` is the data version right after it; each updated
+    # row bumped it by one. Patches each changed column once for the whole batch.
+    def apply_updates(self, version, changes):
+        import pandas as pd
+        with self._lock:
+            if self.df is None or self.version != version - len(changes):
+                return  # Stale or empty, the next get() reloads
+            df = self.df.copy()  # See apply()
+            try:
+                positions = pd.Index(df['id']).get_indexer(list(changes))
+                if (positions < 0).any():
+                    raise ValueError("updated product not in the cache")
+                for col in PRODUCT_COLUMNS:
+                    rows = [(position, values[col]) for position, values in zip(positions, changes.values()) if col in values]
+                    if col == 'id' or not rows:
+                        continue
+                    df = self._add_categories(df, col, [value for _, value in rows])
+                    typed = pd.Series([value for _, value in rows]).astype(df[col].dtype)
+                    df.loc[df.index[[position for position, _ in rows]], col] = typed.values
+            except (TypeError, ValueError, OverflowError):
+                self.df, self.version = None, None  # Doesn't fit the cached types, the next get() reloads
+                return
+            self.df, self.version = df, version
+
+    # One-row DataFrame of `product_data` in the types of `df`, adding any new
+    # location/hook values to the categories of `df` (a copy owned by the caller) first
+    @classmethod
+    def _typed_row(cls, df, product_data):
+        import pandas as pd
+        row = {col: product_data.get(col, '') for col in PRODUCT_COLUMNS}
+        for col in PRODUCT_COLUMNS:
+            df = cls._add_categories(df, col, [row[col]])
+        return df, pd.DataFrame([row]).astype(df.dtypes.to_dict())
+
+    @staticmethod
+    def _add_categories(df, col, values):
+        import pandas as pd
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            new_values = {value for value in values if pd.notna(value)} - set(df[col].cat.categories)
+            if new_values:
+                df[col] = df[col].cat.add_categories(sorted(new_values))
+        return df
+
+    def clear(self):
+        with self._lock:
+            self.df, self.version = None, None
+
+    # Write the cached catalog as the snapshot of `version` if it holds that version
+    # and the snapshot doesn't exist yet. Returns the version, or None if the cache
+    # is empty or stale.
+    def publish(self, snapshot_dir, database_id, version):
+        with self._lock:
+            if self.df is None or self.version != version:
+                return None
+            path = snapshot_path(snapshot_dir, database_id, self.version)
+            if not os.path.exists(path):
+                write_snapshot(self.df, path)
+            return self.version
+
+
+catalog_cache = CatalogCache()
+
+
+# --- Shared catalog snapshots ---
+# After writes (and after a process had to load the catalog from SQLite) a
+# background thread publishes the catalog of the current data version, so other
+# server processes reload it by mapping a file. Only a cache already at that
+# version is published (one patched by the write, or just loaded), so processes
+# that never read the whole catalog, like bulk imports, never load it for this.
+# Requests arriving while a snapshot is being written are coalesced.
+CATALOG_SNAPSHOT_DIR = os.environ.get('PRODUCTS_SNAPSHOT_DIR', os.path.join(os.path.dirname(DB_PATH), 'snapshots'))
+CATALOG_SNAPSHOTS_ENABLED = os.environ.get('PRODUCTS_CATALOG_SNAPSHOTS', "1") != "0"
+
+
+class CatalogSnapshotPublisher:
+    def __init__(self, snapshot_dir=CATALOG_SNAPSHOT_DIR, enabled=CATALOG_SNAPSHOTS_ENABLED):
+        self.snapshot_dir = snapshot_dir
+        self.enabled = enabled
+        self.published = 0
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # Catalog DataFrame of `version` mapped from its snapshot, or None if not published
+    def load(self, version):
+        if not self.enabled:
+            return None
+        try:
+            df = read_snapshot(snapshot_path(self.snapshot_dir, get_database_id(), version))
+        except ImportError:
+            self.enabled = False
+            return None
+        except Exception:
+            logger.exception("Reading catalog snapshot %s failed", version)
+            df = None
+        count_cache_lookup("catalog_snapshot", hit=df is not None)
+        return df
+
+    # Publish soon; nothing to do until this process holds the catalog
+    def request(self):
+        if not self.enabled or catalog_cache.df is None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="catalog-snapshots", daemon=True)
+                self._thread.start()
+        self._event.set()
+
+    def _run(self):
+        while True:
+            self._event.wait()
+            self._event.clear()
+            try:
+                self.publish()
+            except ImportError:
+                self.enabled = False
+                return
+            except Exception:
+                logger.exception("Publishing catalog snapshot failed")
+
+    def publish(self):
+        database_id = get_database_id()
+        version = catalog_cache.publish(self.snapshot_dir, database_id, get_data_version())
+        if version is not None:
+            self.published += 1
+            prune_snapshots(self.snapshot_dir, database_id)
+        return version
+
+
+catalog_snapshots = CatalogSnapshotPublisher()
+db_writer.after_batch = catalog_snapshots.request
+
+
+# Cache a read helper in st.cache_data keyed on the current data version,
+# so entries go stale on their own after a write instead of being cleared.
+# Hits and misses are counted per function in the cache_requests metric.
+def cache_by_data_version(func):
+    calls = threading.local()
+
+    @st.cache_data(ttl=3600, max_entries=1000)
+    def cached(func_name, data_version, *args, **kwargs):
+        calls.missed = True
+        return func(*args, **kwargs)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        calls.missed = False
+        result = cached(func.__qualname__, get_data_version(), *args, **kwargs)
+        count_cache_lookup(func.__name__, hit=not calls.missed)
+        return result
+    return wrapper
+
 
 # Function to load data from SQLite
-@st.cache_data(ttl=3600)
+# Served from the versioned catalog cache; treat the returned DataFrame as read-only.
+@instrument("load_data")
 def load_data():
+    import pandas as pd
     try:
-        conn = get_db_connection()
-        df = pd.read_sql_query("SELECT * FROM products", conn)
-        conn.close()
-        expected_cols = ['id', 'mould_no', 'description', 'image_url', 'location', 'hook', 'cavaties', 'part_wt', 'short_wt']
-        for col in expected_cols:
-            if col not in df.columns:
-                df[col] = ''
-        df = df[expected_cols]
-        return df
+        return catalog_cache.get()
     except Exception as e:
+        count_error("load_data")
         st.error(f"Error loading data from SQLite: {e}.")
-        return pd.DataFrame(columns=['id', 'mould_no', 'description', 'image_url', 'location', 'hook', 'cavaties', 'part_wt', 'short_wt'])
+        return pd.DataFrame(columns=PRODUCT_COLUMNS)
+
+
+# --- Facet filters ---
+# `filters` is a dict with any of:
+#   'location' / 'hook' / 'cavaties': list of accepted values
+#   'part_wt' / 'short_wt': (min, max) inclusive range, either end may be None
+FACET_COLUMNS = ['location', 'hook', 'cavaties']
+RANGE_COLUMNS = ['part_wt', 'short_wt']
+
+
+# Build an SQL condition (and its parameters) for `filters`; columns are qualified with `table`
+def build_filter_clause(filters, table="products"):
+    conditions, params = [], []
+    for column in FACET_COLUMNS:
+        values = (filters or {}).get(column)
+        if values:
+            conditions.append(f"{table}.{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    for column in RANGE_COLUMNS:
+        low, high = (filters or {}).get(column) or (None, None)
+        if low is not None:
+            conditions.append(f"{table}.{column} >= ?")
+            params.append(low)
+        if high is not None:
+            conditions.append(f"{table}.{column} <= ?")
+            params.append(high)
+    return " AND ".join(conditions) or "1", params
+
+
+# Function to count products in SQLite, optionally only those matching `filters`
+@cache_by_data_version
+def count_products(filters=None):
+    where, params = build_filter_clause(filters)
+    try:
+        with db_connection() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM products WHERE {where}", params).fetchone()[0]
+        return total
+    except Exception as e:
+        st.error(f"Error counting products in SQLite: {e}")
+        return 0
+
+
+# Function to load one page of products ordered by ID using keyset pagination.
+# `cursor_id` is the last ID of the previous page (direction "next") or the
+# first ID of the following page (direction "prev"). Seeking on the primary
+# key keeps deep pages as cheap as the first one, unlike OFFSET.
+# Returns the page and whether more rows exist beyond it in that direction.
+@cache_by_data_version
+def get_products_page(cursor_id=None, direction="next", page_size=25, filters=None):
+    import pandas as pd
+    where, params = build_filter_clause(filters)
+    if direction == "prev" and cursor_id is not None:
+        query = f"SELECT * FROM products WHERE {where} AND id < ? ORDER BY id DESC LIMIT ?"
+        params += [cursor_id, page_size + 1]
+    elif cursor_id is not None:
+        query = f"SELECT * FROM products WHERE {where} AND id > ? ORDER BY id LIMIT ?"
+        params += [cursor_id, page_size + 1]
+    else:
+        query = f"SELECT * FROM products WHERE {where} ORDER BY id LIMIT ?"
+        params += [page_size + 1]
+    try:
+        with db_connection() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+        has_more = len(df) > page_size
+        df = df.head(page_size)
+        if direction == "prev":
+            df = df.iloc[::-1]
+        return df[PRODUCT_COLUMNS].reset_index(drop=True), has_more
+    except Exception as e:
+        st.error(f"Error loading products page from SQLite: {e}")
+        return pd.DataFrame(columns=PRODUCT_COLUMNS), False
+
+
+# Function to get the facet value counts, read from the incrementally maintained
+# facet_counts table: {facet: [(value, count), ...]} ordered by value
+@cache_by_data_version
+def get_facet_counts():
+    facets = {column: [] for column in FACET_COLUMNS}
+    try:
+        with db_connection() as conn:
+            rows = conn.execute("SELECT facet, value, count FROM facet_counts ORDER BY facet, value").fetchall()
+        for row in rows:
+            facets[row['facet']].append((row['value'], row['count']))
+    except Exception as e:
+        st.error(f"Error loading facet counts from SQLite: {e}")
+    return facets
+
+
+# Function to get inventory statistics from the summary table:
+# {'all' / 'location' / 'hook': [{'value', 'product_count', 'total_cavities', 'avg_part_wt', 'avg_short_wt'}]}
+def get_inventory_summary():
+    summary = {dimension: [] for dimension in SUMMARY_DIMENSIONS}
+    try:
+        with db_connection() as conn:
+            rows = conn.execute('''SELECT dimension, value, product_count, total_cavities,
+                part_wt_sum / NULLIF(part_wt_count, 0) AS avg_part_wt, short_wt_sum / NULLIF(short_wt_count, 0) AS avg_short_wt
+                FROM inventory_summary ORDER BY dimension, value''').fetchall()
+        for row in rows:
+            summary[row['dimension']].append({key: row[key] for key in row.keys() if key != 'dimension'})
+    except Exception as e:
+        st.error(f"Error loading inventory statistics from SQLite: {e}")
+    return summary
+
+
+# Function to get the (min, max) of each weight column; answered from the indexes
+@cache_by_data_version
+def get_range_bounds():
+    bounds = {}
+    try:
+        with db_connection() as conn:
+            for column in RANGE_COLUMNS:
+                # Separate MIN and MAX subqueries each resolve with a single index seek
+                row = conn.execute(f"SELECT (SELECT MIN({column}) FROM products), (SELECT MAX({column}) FROM products)").fetchone()
+                bounds[column] = (row[0] or 0.0, row[1] or 0.0)
+    except Exception as e:
+        st.error(f"Error loading weight ranges from SQLite: {e}")
+    return bounds
+
+
+# Turn free text into an FTS5 query: every word must match as a prefix.
+# Words are quoted so user input can never be parsed as FTS5 syntax.
+def build_fts_query(search_query: str):
+    tokens = re.findall(r'\w+', search_query.lower())
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+# Function to search products using the FTS5 index, best matches first
+@cache_by_data_version
+def search_products(search_query: str, limit: int = 100, offset: int = 0, filters=None):
+    import pandas as pd
+    fts_query = build_fts_query(search_query)
+    if not fts_query:
+        return pd.DataFrame(columns=PRODUCT_COLUMNS)
+    where, filter_params = build_filter_clause(filters, table="p")
+    try:
+        with db_connection() as conn:
+            # bm25 column weights: id, mould_no, description, location
+            df = pd.read_sql_query(
+                f"""SELECT p.* FROM products_fts
+                JOIN products p ON p.rowid = products_fts.rowid
+                WHERE products_fts MATCH ? AND {where}
+                ORDER BY bm25(products_fts, 10.0, 5.0, 1.0, 2.0)
+                LIMIT ? OFFSET ?""",
+                conn,
+                params=[fts_query, *filter_params, limit, offset],
+            )
+        return df[PRODUCT_COLUMNS]
+    except Exception as e:
+        st.error(f"Error searching products in SQLite: {e}")
+        return pd.DataFrame(columns=PRODUCT_COLUMNS)
+
+
+# --- Fuzzy search ---
+FUZZY_COLUMNS = ['id', 'mould_no', 'location']
+FUZZY_MAX_POSTINGS = 2000  # trigrams found in more products than this are too common to narrow the search
+FUZZY_CANDIDATES = 200
+# SQLite's lower() only folds ASCII letters; fuzzy keys are looked up folded the same way
+ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+# Trigram set of a value, padded like pg_trgm so leading characters weigh more
+def trigrams(text):
+    padded = f"  {str(text).lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Trigram (Jaccard) similarity of a value to an already computed trigram set, from 0.0 to 1.0
+def trigram_similarity(query_trigrams, value):
+    value_trigrams = trigrams(value)
+    return len(query_trigrams & value_trigrams) / len(query_trigrams | value_trigrams)
+
+
+# Number of edits (0 or 1) turning one string into the other when a single
+# substitution, insertion, deletion or swap of adjacent characters is enough, else None
+def single_edit_distance(a, b):
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > 1:
+        return None
+    i = 0
+    while i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) > len(b):
+        return 1 if a[i + 1:] == b[i:] else None
+    if a[i + 1:] == b[i + 1:]:
+        return 1
+    if i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]:
+        return 1
+    return None
+
+
+# Whether a query is long enough for one typo to be tolerated (a single character has to match exactly)
+def typo_tolerant(query):
+    return len(query) > 1
+
+
+# Number of edits between the query and a value it matches by edit distance, else None
+def fuzzy_edits(query, value):
+    edits = single_edit_distance(query, value)
+    return edits if edits == 0 or (edits == 1 and typo_tolerant(query)) else None
+
+
+# Similarity of a product value to the query, from 0.0 to 1.0: the trigram similarity,
+# or for a value one typo away from the query the share of its characters that are
+# right if higher. Short codes share too few trigrams to score well otherwise:
+# M356 and M456 have a trigram similarity of 0.25 but three characters of four right.
+def fuzzy_similarity(query, query_trigrams, value):
+    value = str(value).lower()
+    similarity = trigram_similarity(query_trigrams, value)
+    edits = fuzzy_edits(query, value)
+    if edits is not None:
+        similarity = max(similarity, 1 - edits / max(len(query), len(value)))
+    return similarity
+
+
+# Function to find products whose ID, mould number or location resembles the query,
+# tolerating typos. Candidates are collected from the fuzzy keys of short IDs and
+# mould numbers (one typo anywhere), the rack locations within one typo and the
+# products sharing the most selective trigrams; only those are scored in Python,
+# best match first.
+@cache_by_data_version
+def fuzzy_search_products(search_query: str, limit: int = 20, min_similarity: float = 0.3, filters=None):
+    import pandas as pd
+    empty = pd.DataFrame(columns=PRODUCT_COLUMNS + ['similarity'])
+    query = search_query.strip().lower()
+    if not query:
+        return empty
+    try:
+        locations = [value for value, _ in get_facet_counts().get('location', [])
+                     if fuzzy_edits(query, value.lower()) is not None]
+        candidates = set()
+        shared = {}
+        with db_connection() as conn:
+            key_query = search_query.strip().translate(ASCII_LOWER)
+            if len(key_query) <= FUZZY_KEY_MAX_LENGTH + 1:
+                keys = {key_query}
+                if typo_tolerant(key_query):
+                    keys.update(key_query[:i] + key_query[i + 1:] for i in range(len(key_query)))
+                candidates.update(row[0] for row in conn.execute(
+                    f"SELECT DISTINCT product FROM products_fuzzy_keys WHERE key IN ({', '.join('?' * len(keys))}) LIMIT ?",
+                    [*sorted(keys), FUZZY_CANDIDATES],
+                ))
+            for trigram in {query[i:i + 3] for i in range(len(query) - 2)}:
+                # Quoted so trigrams are matched literally; double quotes are escaped by doubling
+                rows = conn.execute(
+                    "SELECT rowid FROM products_trigram WHERE products_trigram MATCH ? LIMIT ?",
+                    ('"' + trigram.replace('"', '""') + '"', FUZZY_MAX_POSTINGS + 1),
+                ).fetchall()
+                if len(rows) > FUZZY_MAX_POSTINGS:
+                    continue
+                for row in rows:
+                    shared[row[0]] = shared.get(row[0], 0) + 1
+            candidates.update(sorted(shared, key=shared.get, reverse=True)[:FUZZY_CANDIDATES])
+            where, params = build_filter_clause(filters)
+            # Few distinct locations exist, so they are compared directly. All products at
+            # a location score alike, so only the first `limit` by ID can be shown.
+            for location in locations:
+                candidates.update(row[0] for row in conn.execute(
+                    f"SELECT rowid FROM products WHERE location = ? AND {where} ORDER BY id LIMIT ?",
+                    [location, *params, limit],
+                ))
+            if not candidates:
+                return empty
+            df = pd.read_sql_query(
+                f"SELECT * FROM products WHERE rowid IN ({', '.join('?' * len(candidates))}) AND {where}",
+                conn, params=[*candidates, *params],
+            )
+        df = df[PRODUCT_COLUMNS]
+        query_trigrams = trigrams(query)
+        df['similarity'] = [
+            max(fuzzy_similarity(query, query_trigrams, value) for value in values if value is not None)
+            for values in df[FUZZY_COLUMNS].itertuples(index=False)
+        ]
+        df = df[df['similarity'] >= min_similarity]
+        return df.sort_values(['similarity', 'id'], ascending=[False, True]).head(limit).reset_index(drop=True)
+    except Exception as e:
+        st.error(f"Error searching similar products in SQLite: {e}")
+        return empty
+
+
+# Generator streaming products ordered by ID as lists of at most `batch_size` dicts,
+# optionally restricted to matches of a search query and/or facet filters. Rows are
+# stepped through the cursor, so only one batch is in memory at a time. Raises on
+# database errors.
+def iter_products(search_query=None, batch_size=1000, filters=None):
+    fts_query = build_fts_query(search_query or "")
+    if fts_query:
+        where, params = build_filter_clause(filters, table="p")
+        query = f"""SELECT {', '.join('p.' + col for col in PRODUCT_COLUMNS)} FROM products_fts
+            JOIN products p ON p.rowid = products_fts.rowid
+            WHERE products_fts MATCH ? AND {where}
+            ORDER BY p.id"""
+        params = [fts_query, *params]
+    elif search_query and search_query.strip():
+        return  # Nothing searchable in the query, so nothing matches
+    else:
+        where, params = build_filter_clause(filters)
+        query = f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE {where} ORDER BY id"
+    with db_connection() as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [dict(row) for row in rows]
+
+
+HOOK_OPTIONS = ["Plastic", "Metal"]
+
+
+# Validate a product record with the same rules as the add form.
+# Returns an error message, or None if the record is valid.
+def validate_product(product_data: dict):
+    product_id = product_data.get('id', '')
+    if not product_id:
+        return "Product ID is a required field."
+    if len(product_id) > 50:
+        return "Product ID must be 50 characters or less."
+    if not product_id.replace('_', '').replace('-', '').isalnum():
+        return "Product ID can only contain letters, numbers, hyphens, and underscores."
+    if len(product_data.get('description', '')) > 1000:
+        return "Description must be 1000 characters or less."
+    if len(product_data.get('mould_no', '')) > 100:
+        return "Mould Number must be 100 characters or less."
+    if len(product_data.get('location', '')) > 100:
+        return "Location must be 100 characters or less."
+    if product_data.get('hook') not in HOOK_OPTIONS:
+        return f"Hook must be one of: {', '.join(HOOK_OPTIONS)}."
+    if not 1 <= product_data.get('cavaties', 1) <= 100:
+        return "Cavities must be between 1 and 100."
+    if not all(math.isfinite(product_data.get(field, 0.0)) for field in ('part_wt', 'short_wt')):
+        return "Weights must be numbers."
+    if product_data.get('part_wt', 0.0) < 0 or product_data.get('short_wt', 0.0) < 0:
+        return "Weights cannot be negative."
+    return None
 
 
 # Function to add a product to SQLite
+@instrument("add_product_to_db", error_when=lambda ok: not ok)
 def add_product_to_db(product_data: dict):
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''INSERT INTO products (id, mould_no, description, image_url, location, hook, cavaties, part_wt, short_wt)
+    def insert(conn):
+        conn.execute('''INSERT INTO products (id, mould_no, description, image_url, location, hook, cavaties, part_wt, short_wt)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
             (
                 product_data['id'],
@@ -82,9 +1320,10 @@ def add_product_to_db(product_data: dict):
                 product_data['short_wt']
             )
         )
-        conn.commit()
-        conn.close()
-        st.cache_data.clear()
+        return read_data_version(conn)
+
+    try:
+        run_write(insert, lambda version: catalog_cache.apply(version, "insert", product_data['id'], product_data))
         return True
     except sqlite3.IntegrityError:
         st.error("Product ID already exists.")
@@ -94,120 +1333,418 @@ def add_product_to_db(product_data: dict):
         return False
 
 
+# Function to insert or update many products in a single transaction.
+# Existing products only have `update_fields` overwritten (all fields by default).
+# Raises on database errors so batch callers can report them per row.
+def upsert_products(products: list, update_fields=None):
+    update_fields = [col for col in (update_fields or PRODUCT_COLUMNS) if col in PRODUCT_COLUMNS and col != 'id']
+    on_conflict = (
+        "DO UPDATE SET " + ", ".join(f"{col}=excluded.{col}" for col in update_fields)
+        if update_fields else "DO NOTHING"
+    )
+
+    def upsert(conn):
+        conn.executemany(f'''INSERT INTO products (id, mould_no, description, image_url, location, hook, cavaties, part_wt, short_wt)
+            VALUES (:id, :mould_no, :description, :image_url, :location, :hook, :cavaties, :part_wt, :short_wt)
+            ON CONFLICT(id) {on_conflict}''',
+            products
+        )
+
+    run_write(upsert)
+    return len(products)
+
+
 # Function to delete a product from SQLite
+@instrument("delete_product_from_db", error_when=lambda ok: not ok)
 def delete_product_from_db(product_id: str):
+    def delete(conn):
+        cursor = conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+        return cursor.rowcount, read_data_version(conn)
+
+    def on_commit(result):
+        deleted, version = result
+        if deleted:
+            catalog_cache.apply(version, "delete", product_id)
+
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM products WHERE id = ?", (product_id,))
-        conn.commit()
-        conn.close()
-        st.cache_data.clear()
+        run_write(delete, on_commit)
         return True
     except Exception as e:
         st.error(f"Error deleting product from SQLite: {e}")
         return False
 
 
-# Function to update a product in SQLite
+# Function to update a product in SQLite. Only the columns in `product_data` change, so
+# a form that leaves out image_url can't undo an upload that finished after it loaded.
+@instrument("update_product_in_db", error_when=lambda ok: not ok)
 def update_product_in_db(product_id: str, product_data: dict):
+    columns = [col for col in PRODUCT_COLUMNS if col != 'id' and col in product_data]
+
+    def update(conn):
+        cursor = conn.execute(f"UPDATE products SET {', '.join(f'{col}=?' for col in columns)} WHERE id=?",
+                              [product_data[col] for col in columns] + [product_id])
+        row = conn.execute("SELECT * FROM products WHERE id = ?", (product_id,)).fetchone()
+        return cursor.rowcount, dict(row) if row else None, read_data_version(conn)
+
+    def on_commit(result):
+        updated, row, version = result
+        if updated and row is not None:
+            catalog_cache.apply(version, "update", product_id, row)
+
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''UPDATE products SET mould_no=?, description=?, image_url=?, location=?, hook=?, cavaties=?, part_wt=?, short_wt=? WHERE id=?''',
-            (
-                product_data['mould_no'],
-                product_data['description'],
-                product_data['image_url'],
-                product_data['location'],
-                product_data['hook'],
-                product_data['cavaties'],
-                product_data['part_wt'],
-                product_data['short_wt'],
-                product_id
-            )
-        )
-        conn.commit()
-        conn.close()
-        st.cache_data.clear()
+        run_write(update, on_commit)
         return True
     except Exception as e:
         st.error(f"Error updating product in SQLite: {e}")
         return False
 
 
+# Function to apply edited cells to many products, {product_id: {column: value}},
+# in one transaction with a single executemany. Only the given columns change
+# (unchanged ones are passed as NULL and kept). Returns the number of products updated,
+# or None on error.
+@instrument("update_products_in_db", error_when=lambda updated: updated is None)
+def update_products_in_db(changes: dict):
+    columns = [col for col in PRODUCT_COLUMNS if col != 'id']
+    rows = [{'id': product_id, **{col: values.get(col) for col in columns}} for product_id, values in changes.items()]
+
+    def update(conn):
+        cursor = conn.executemany(f'''UPDATE products SET {", ".join(f"{col}=coalesce(:{col}, {col})" for col in columns)}
+            WHERE id = :id''', rows)
+        return cursor.rowcount, read_data_version(conn)
+
+    def on_commit(result):
+        updated, version = result
+        if updated == len(changes):
+            catalog_cache.apply_updates(version, changes)
+
+    if not changes:
+        return 0
+    try:
+        updated, _ = run_write(update, on_commit)
+        return updated
+    except Exception as e:
+        st.error(f"Error updating products in SQLite: {e}")
+        return None
+
+
 # Function to get a single product from SQLite
+@instrument("get_product_by_id")
 def get_product_by_id(product_id: str):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
+            row = cursor.fetchone()
         if row:
             return dict(row)
         else:
             return None
     except Exception as e:
+        count_error("get_product_by_id")
         st.error(f"Error fetching product from SQLite: {e}")
         return None
 
 
 
-# Helper Function to Resize Image
-def resize_image(image_bytes, size=(200, 200)):
+# --- Image storage ---
+# See image_store for the content-addressed rendition layout.
+PENDING_IMAGE_TIMEOUT = 600  # seconds after which an unfinished image job is considered lost
+
+
+# Resolve an image_url to an absolute path inside IMAGES_DIR (None if it points outside)
+def local_image_path(image_url):
+    absolute_path = os.path.abspath(os.path.join(os.path.dirname(__file__), image_url))
+    images_dir_abs = os.path.abspath(IMAGES_DIR)
+    # Ensure path is within images directory (security check)
+    if not absolute_path.startswith(images_dir_abs + os.sep):
+        return None
+    return absolute_path
+
+
+# Pick the smallest stored rendition of a local image that still covers `width` pixels.
+# Returns an absolute path, or None if the image is missing or outside IMAGES_DIR.
+def get_image_rendition(image_url, width=200):
+    absolute_path = local_image_path(image_url)
+    if absolute_path is None or not os.path.exists(absolute_path):
+        return None
+    return pick_rendition(absolute_path, width)
+
+
+image_bytes_cache = ImageBytesCache(on_lookup=lambda hit: count_cache_lookup("image", hit))
+
+
+# Bytes of the best rendition of a local image for `width`, served from the
+# in-process image cache. Returns None if the image is missing or outside IMAGES_DIR.
+def load_image_bytes(image_url, width=200):
+    absolute_path = local_image_path(image_url)
+    if absolute_path is None:
+        return None
+    return image_bytes_cache.get(pick_rendition(absolute_path, width))
+
+
+def image_url_for_path(image_path):
+    return os.path.relpath(image_path, os.path.dirname(__file__))
+
+
+# Read and validate an uploaded image (size limit, recognisable image header).
+# Returns the raw bytes, or None after showing an error.
+def read_uploaded_image(uploaded_file):
+    from PIL import Image
+    image_bytes = uploaded_file.getvalue()
+
+    # Validate file size (max 5MB)
+    if len(image_bytes) > 5 * 1024 * 1024:
+        st.error("Image file too large. Maximum size is 5MB.")
+        return None
+
     try:
-        image = Image.open(io.BytesIO(image_bytes))
-        image = image.convert("RGB")
-        image = image.resize(size)
-        return image
+        # Only parses the header; decoding happens when renditions are built
+        Image.open(io.BytesIO(image_bytes))
     except Exception as e:
-        st.error(f"Error resizing image: {e}")
+        st.error(f"Invalid image file: {e}")
         return None
+    return image_bytes
 
 
-
-# Upload Function: Save image locally and return relative path
+# Upload Function: Save image renditions locally (deduplicated by content) and return
+# the relative path of the largest JPEG rendition for use in image_url
+@instrument("upload_image_to_local")
 def upload_image_to_local(uploaded_file, product_id):
     if uploaded_file is None:
         return ""
-    
-    # Sanitize product_id to prevent path traversal
-    import re
-    safe_product_id = re.sub(r'[^a-zA-Z0-9_-]', '_', str(product_id))
-    if not safe_product_id or len(safe_product_id) > 50:
-        st.error("Invalid product ID for file naming.")
+
+    image_bytes = read_uploaded_image(uploaded_file)
+    if image_bytes is None:
+        count_error("upload_image_to_local")
         return ""
-    
-    image_bytes = uploaded_file.getvalue()
-    
-    # Validate file size (max 5MB)
-    if len(image_bytes) > 5 * 1024 * 1024:
-        st.error("Image file too large. Maximum size is 5MB.")
+
+    try:
+        image_path = store_image(image_bytes, IMAGES_DIR)
+    except OSError as e:
+        count_error("upload_image_to_local")
+        st.error(f"Error saving image locally: {e}")
         return ""
-    
-    resized_image_obj = resize_image(image_bytes)
-    if resized_image_obj is None:
+    except Exception as e:
+        count_error("upload_image_to_local")
+        st.error(f"Error resizing image: {e}")
         st.error("Failed to resize image, upload cancelled.")
         return ""
-    
-    unique_filename = f"{safe_product_id}-{uuid.uuid4()}.jpg"
-    image_path = os.path.join(IMAGES_DIR, unique_filename)
-    
-    # Ensure the path is within the images directory (prevent path traversal)
-    image_path = os.path.abspath(image_path)
-    images_dir_abs = os.path.abspath(IMAGES_DIR)
-    if not image_path.startswith(images_dir_abs):
-        st.error("Invalid file path detected.")
-        return ""
-    
+
+    image_url = image_url_for_path(image_path)
+    # Indexed right away, so the files are collected if the product is never saved
+    run_write(lambda conn: register_image(conn, image_url))
+    st.success("Image uploaded successfully!")
+    # Return relative path for use in image_url
+    return image_url
+
+
+# --- Background image processing ---
+# Uploads from the add/update pages are decoded and resized in the image_worker
+# process pool, so saving a product doesn't wait for image processing.
+# Function to point a product at a stored image, updating the cached catalog
+def set_product_image(product_id: str, image_url: str, job_id=None):
+    def update_image(conn):
+        register_image(conn, image_url)
+        image_path = local_image_path(image_url)
+        if image_path is not None and not os.path.exists(image_path):
+            return None  # Removed by the orphan sweeper in the meantime
+        if job_id is not None:
+            # Only the most recent upload for a product may set its image
+            deleted = conn.execute("DELETE FROM pending_images WHERE product_id = ? AND job_id = ?",
+                                   (product_id, job_id)).rowcount
+            if not deleted:
+                return None
+        cursor = conn.execute("UPDATE products SET image_url = ? WHERE id = ?", (image_url, product_id))
+        row = conn.execute("SELECT * FROM products WHERE id = ?", (product_id,)).fetchone()
+        if not cursor.rowcount or row is None:
+            return None
+        return dict(row), read_data_version(conn)
+
+    def on_commit(result):
+        if result is not None:
+            row, version = result
+            catalog_cache.apply(version, "update", product_id, row)
+
+    return run_write(update_image, on_commit) is not None
+
+
+# Function to get the IDs of products whose uploaded image is still being processed
+def get_pending_image_ids():
     try:
-        resized_image_obj.save(image_path, format="JPEG")
-        st.success("Image uploaded successfully!")
-        # Return relative path for use in image_url
-        return os.path.relpath(image_path, os.path.dirname(__file__))
+        with db_connection() as conn:
+            rows = conn.execute("SELECT product_id FROM pending_images WHERE submitted_at > ?",
+                                (time.time() - PENDING_IMAGE_TIMEOUT,)).fetchall()
+        return {row['product_id'] for row in rows}
     except Exception as e:
-        st.error(f"Error saving image locally: {e}")
-        return ""
-    
+        st.error(f"Error loading pending images from SQLite: {e}")
+        return set()
+
+
+# Forget a product's pending upload (only job `job_id`, if given)
+def clear_pending_image(product_id, job_id=None):
+    if job_id is None:
+        run_write(lambda conn: conn.execute("DELETE FROM pending_images WHERE product_id = ?", (product_id,)).rowcount)
+    else:
+        run_write(lambda conn: conn.execute("DELETE FROM pending_images WHERE product_id = ? AND job_id = ?",
+                                            (product_id, job_id)).rowcount)
+
+
+def finish_image_job(product_id, job_id, image_path, error):
+    if error is not None:
+        logger.error("Image processing failed for product %s: %s", product_id, error)
+        clear_pending_image(product_id, job_id)
+        return
+    set_product_image(product_id, image_url_for_path(image_path), job_id)
+
+
+# Hand an uploaded image for an already saved product to the image worker pool.
+# The product keeps its current image until processing finishes, then image_url is
+# filled in. Returns True if the image was stored or queued.
+@instrument("upload_image_in_background", error_when=lambda queued: not queued)
+def upload_image_in_background(uploaded_file, product_id):
+    if uploaded_file is None:
+        return False
+
+    image_bytes = read_uploaded_image(uploaded_file)
+    if image_bytes is None:
+        return False
+
+    # Already stored (same photo uploaded before): no processing needed
+    image_path = stored_image_path(IMAGES_DIR, image_digest(image_bytes))
+    if os.path.exists(image_path):
+        clear_pending_image(product_id)
+        if set_product_image(product_id, image_url_for_path(image_path)):
+            return True
+
+    job_id = uuid.uuid4().hex
+    try:
+        run_write(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO pending_images (product_id, job_id, submitted_at) VALUES (?, ?, ?)",
+            (product_id, job_id, time.time())).rowcount)
+        queued = image_worker.submit(
+            image_bytes, IMAGES_DIR,
+            lambda image_path, error: finish_image_job(product_id, job_id, image_path, error),
+        )
+    except Exception:
+        queued = False
+        logger.exception("Could not queue image for product %s", product_id)
+    if not queued:
+        clear_pending_image(product_id, job_id)
+        st.error("Image processing is busy, please try uploading the image again shortly.")
+        return False
+    return True
+
+
+# --- Orphaned image collection ---
+IMAGE_GC_GRACE_PERIOD = 24 * 3600  # seconds an image must stay unreferenced before it is removed
+IMAGE_GC_BATCH_SIZE = 100
+
+
+# Stored images with no referencing product for longer than `grace_period` seconds,
+# oldest first, as [(image_url, unreferenced_since)]
+def get_orphaned_images(grace_period=IMAGE_GC_GRACE_PERIOD, limit=IMAGE_GC_BATCH_SIZE, conn=None):
+    query = """SELECT image_url, unreferenced_since FROM image_refs
+        WHERE ref_count <= 0 AND unreferenced_since < ? ORDER BY unreferenced_since LIMIT ?"""
+    params = (time.time() - grace_period, limit)
+    if conn is not None:
+        return [tuple(row) for row in conn.execute(query, params)]
+    with db_connection() as conn:
+        return [tuple(row) for row in conn.execute(query, params)]
+
+
+# Remove a shard directory and its parent once they are empty (never IMAGES_DIR itself)
+def remove_empty_shard_dirs(shard_dir):
+    images_dir_abs = os.path.abspath(IMAGES_DIR)
+    for directory in (shard_dir, os.path.dirname(shard_dir)):
+        if os.path.abspath(directory) == images_dir_abs:
+            break
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break  # Not empty (or already gone)
+
+
+# Delete the files of images that have been unreferenced for longer than
+# `grace_period` seconds and drop them from the index. Each batch runs as one write
+# operation, so an image can't be re-attached between the check and the delete.
+# Returns (images removed, bytes freed).
+def sweep_orphaned_images(grace_period=IMAGE_GC_GRACE_PERIOD, batch_size=IMAGE_GC_BATCH_SIZE):
+    def sweep_batch(conn):
+        removed, freed = 0, 0
+        orphans = get_orphaned_images(grace_period, batch_size, conn)
+        for image_url, _ in orphans:
+            image_path = local_image_path(image_url)
+            for path in image_file_paths(image_path) if image_path is not None else []:
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    freed += size
+                except FileNotFoundError:
+                    pass
+            if image_path is not None:
+                remove_empty_shard_dirs(os.path.dirname(image_path))
+            conn.execute("DELETE FROM image_refs WHERE image_url = ? AND ref_count <= 0", (image_url,))
+            removed += 1
+        return removed, freed, len(orphans) == batch_size
+
+    total_removed, total_freed, more = 0, 0, True
+    while more:
+        removed, freed, more = run_write(sweep_batch)
+        total_removed += removed
+        total_freed += freed
+    if total_removed:
+        pick_stored_rendition.cache_clear()
+    return total_removed, total_freed
+
+
+# Register image files on disk that the index doesn't know about yet (e.g. uploads
+# from before the index existed) as unreferenced. This is the only operation that
+# walks the images directory. Returns the number of images registered.
+def index_unreferenced_image_files():
+    with db_connection() as conn:
+        referenced = {local_image_path(row[0]) for row in conn.execute("SELECT DISTINCT image_url FROM products")}
+    image_urls = set()
+    for dirpath, _, filenames in os.walk(IMAGES_DIR):
+        for filename in filenames:
+            if filename.endswith('.tmp'):
+                continue  # In-progress (or abandoned) writes
+            match = RENDITION_FILENAME_RE.match(filename)
+            if match:
+                image_path = stored_image_path(IMAGES_DIR, match.group(1))
+            else:
+                image_path = os.path.join(dirpath, filename)
+            # Also skip files products refer to under a differently spelled image_url
+            if os.path.abspath(image_path) not in referenced:
+                image_urls.add(image_url_for_path(image_path))
+
+    def register_batch(conn, batch):
+        before = conn.total_changes
+        for image_url in batch:
+            register_image(conn, image_url)
+        return conn.total_changes - before
+
+    registered = 0
+    image_urls = sorted(image_urls)
+    for start in range(0, len(image_urls), IMAGE_GC_BATCH_SIZE):
+        batch = image_urls[start:start + IMAGE_GC_BATCH_SIZE]
+        registered += run_write(lambda conn: register_batch(conn, batch))
+    return registered
+
+
+# --- Metrics gauges ---
+def get_db_size_bytes():
+    return sum(os.path.getsize(path) for path in (DB_PATH, DB_PATH + '-wal') if os.path.exists(path))
+
 
+metrics_registry.register_gauge("db_size_bytes", "Size of the SQLite database file plus its WAL.", get_db_size_bytes)
+metrics_registry.register_gauge("image_cache_bytes", "Bytes held by the in-process image cache.",
+                                lambda: image_bytes_cache.total_bytes)
+metrics_registry.register_gauge("catalog_cache_rows", "Rows held by the in-process catalog cache.",
+                                lambda: 0 if catalog_cache.df is None else len(catalog_cache.df))
+metrics_registry.register_gauge("writer_batches_total", "Transactions committed by the database writer.",
+                                lambda: db_writer.batches, kind="counter")
+metrics_registry.register_gauge("writer_operations_total", "Write operations committed by the database writer.",
+                                lambda: db_writer.operations, kind="counter")
+metrics_registry.register_gauge("catalog_snapshots_published_total", "Catalog snapshots written by this process.",
+                                lambda: catalog_snapshots.published, kind="counter")